@@ -1,17 +1,79 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from profile_builder import extract_marks_from_pdf, extract_interests_from_certificates, build_student_profile
-from course_matcher import load_courses, get_recommendation_with_context
-
+from course_matcher import (
+    load_courses, get_recommendation_with_deadline, resolve_pending, summarize_turns, expire_pending_note
+)
+from conversation_state import ConversationState
+from chat_memory import ChatMemory, compact_history
+from prefetch import Prefetcher
+from session_store import SessionStore, new_token
+from catalog import catalog_fingerprint, has_shards, parse_sources, resolve_sources, shard_path
+from tracing import start_metrics_server, traced
+from app_logging import configure_logging
+from warmup import warm_up_in_background
+import session_memory
+
+import html
+import re
 import tempfile
 import os
 import time
+from functools import lru_cache
 
 st.set_page_config(page_title="🎓 AI Course Advisor", layout="wide")
 
+# Serve a deterministic recommendation if the LLM hasn't answered within this many ms (0 = wait)
+RESPONSE_DEADLINE_MS = int(os.getenv("RESPONSE_DEADLINE_MS", "5000"))
+# How long to keep waiting for the LLM answer that replaces a fallback
+LATE_ANSWER_TIMEOUT = 60
+# PREFETCH=1 speculatively answers likely follow-ups while the student reads
+PREFETCH_ENABLED = os.getenv("PREFETCH", "").lower() in ("1", "true", "yes")
+# Older messages are folded into the chat memory summary beyond this many
+MAX_SESSION_MESSAGES = int(os.getenv("MAX_SESSION_MESSAGES", "60"))
+# ?admin=<ADMIN_TOKEN> shows per-session memory usage (disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Seconds between memory accounting walks of one session (admin view only)
+MEMORY_RECORD_INTERVAL = 30
+# Only this many recent messages are rendered; older ones are paged in on request
+RENDER_RECENT_MESSAGES = int(os.getenv("RENDER_RECENT_MESSAGES", "12"))
+# MEMORY_TRACE=1 adds tracemalloc allocation sites to the admin view
+if os.getenv("MEMORY_TRACE", "").lower() in ("1", "true", "yes"):
+    session_memory.start_tracing()
+
+# Leveled logging through a background queue (LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE)
+configure_logging()
+
+@st.cache_resource
+def start_warm_up():
+    """Warm caches and the LLM connection once per server process, off the request path"""
+    return warm_up_in_background()
+
+# WARMUP=0 skips preloading the catalog, matchers and LLM connection at server start
+if os.getenv("WARMUP", "1").lower() not in ("0", "false", "no"):
+    start_warm_up()
+
+# Expose per-stage timings for Prometheus when METRICS_PORT is set (TRACING=1 enables spans)
+if os.getenv("METRICS_PORT"):
+    start_metrics_server(int(os.getenv("METRICS_PORT")))
+
+def institution_sources():
+    """Catalog sources chosen by the ?institution= link (comma-separated domains), if any exist"""
+    sources = parse_sources(st.query_params.get("institution"))
+    if not sources or not has_shards():
+        return None
+    if not any(os.path.exists(shard_path(name)) for name in resolve_sources(sources)):
+        return None
+    return sources
+
 # Initialize session state
 if "page" not in st.session_state:
     st.session_state.page = "upload"
 
+# Only the chosen institution's shards are loaded (CATALOG_SOURCES applies otherwise)
+if "catalog_sources" not in st.session_state:
+    st.session_state.catalog_sources = institution_sources()
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
@@ -24,8 +86,69 @@ if "courses" not in st.session_state:
 if "uploaded_files" not in st.session_state:
     st.session_state.uploaded_files = {"marksheet": None, "certificates": []}
 
+@st.cache_resource
+def get_session_store():
+    """One SQLite session store per server process"""
+    return SessionStore()
+
+def persist_session():
+    """Snapshot the session server-side under its resume token (kept in the URL)"""
+    token = st.session_state.get("session_token")
+    if token is None:
+        token = new_token()
+        st.session_state.session_token = token
+        st.query_params["session"] = token
+    state = st.session_state.get("conversation_state")
+    memory = st.session_state.get("chat_memory")
+    get_session_store().save(
+        token,
+        st.session_state.page,
+        st.session_state.profile,
+        st.session_state.messages,
+        state.snapshot() if state else None,
+        memory.snapshot() if memory else None,
+        st.session_state.get("catalog_sources"),
+        catalog_fingerprint(st.session_state.courses) if st.session_state.courses else None
+    )
+
+def restore_session(token):
+    """Rebuild a session from the store without re-parsing PDFs or calling the LLM"""
+    stored = get_session_store().load(token)
+    if stored is None:
+        return False
+    courses = load_courses(sources=stored["catalog_sources"])
+    state = ConversationState(courses)
+    memory = ChatMemory(summarize_fn=summarize_turns)
+    # Snapshots only apply to the catalog they were taken with; otherwise state replays from the messages
+    if stored["catalog_version"] == catalog_fingerprint(courses):
+        state.restore(stored["conversation_state"] or {})
+        memory.restore(stored["chat_memory"] or {})
+    elif stored["conversation_state"]:
+        # The first message may have been compacted away, so keep the initial recommendation
+        state.restore({"initial_recommendation": stored["conversation_state"].get("initial_recommendation")})
+
+    st.session_state.session_token = token
+    st.session_state.page = stored["page"]
+    st.session_state.profile = stored["profile"]
+    # A late LLM answer dies with the old session, so fallbacks can't keep promising one
+    st.session_state.messages = [
+        dict(message, content=expire_pending_note(message["content"])) if message["role"] == "assistant" else message
+        for message in stored["messages"]
+    ]
+    st.session_state.catalog_sources = stored["catalog_sources"]
+    st.session_state.courses = courses
+    st.session_state.conversation_state = state
+    st.session_state.chat_memory = memory
+    st.session_state.prefetcher = Prefetcher() if PREFETCH_ENABLED else None
+    return True
+
+# Resume a stored session after a browser refresh or reconnect
+if st.session_state.profile is None and st.query_params.get("session"):
+    if not restore_session(st.query_params["session"]):
+        del st.query_params["session"]
+
 # Custom CSS for improved styling
-st.markdown("""
+STYLES = """
 <style>
 /* Main styling */
 .main-header {
@@ -149,8 +272,19 @@ st.markdown("""
     line-height: 1.5;
 }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@lru_cache(maxsize=1)
+def minified_styles():
+    """The stylesheet without comments and indentation, built once per process"""
+    css = re.sub(r"/\*.*?\*/", "", STYLES, flags=re.S)
+    return "\n".join(line.strip() for line in css.splitlines() if line.strip())
 
+# Streamlit drops elements a rerun doesn't emit, so the stylesheet is re-sent
+# each run - but only as the prebuilt minified string
+st.markdown(minified_styles(), unsafe_allow_html=True)
+
+@traced("typing_animation")
 def display_typing_animation(text, container):
     """Display typing animation for the response"""
     placeholder = container.empty()
@@ -310,23 +444,53 @@ def assessment_page():
                     # Build profile
                     build_profile()
                     st.session_state.page = "chat"
+                    persist_session()
                     st.rerun()
 
+def assistant_message(response):
+    """Chat message for a response, marking locally asked clarifying questions"""
+    message = {"role": "assistant", "content": response}
+    if st.session_state.profile.get("needs_clarification"):
+        message["kind"] = "clarification"
+    return message
+
+def release_uploads():
+    """Free uploaded PDF bytes held by Streamlit's file manager and the uploader widgets"""
+    files = [st.session_state.uploaded_files["marksheet"]] + list(st.session_state.uploaded_files["certificates"])
+    ctx = get_script_run_ctx()
+    # Only the in-memory manager (Streamlit's default) can drop single files
+    remove_file = getattr(ctx.uploaded_file_mgr, "remove_file", None) if ctx else None
+    for uploaded in files:
+        if uploaded is None:
+            continue
+        if remove_file is not None:
+            remove_file(ctx.session_id, uploaded.file_id)
+        uploaded.close()
+
+    st.session_state.uploaded_files = {"marksheet": None, "certificates": []}
+    for key in ("marksheet_upload", "certificates_upload"):
+        if key in st.session_state:
+            del st.session_state[key]
+
+@traced("build_profile")
 def build_profile():
     """Build student profile from uploaded documents and responses"""
     with st.spinner("Analyzing your profile..."):
         # Process marksheet
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_marks:
-            tmp_marks.write(st.session_state.uploaded_files["marksheet"].read())
+            tmp_marks.write(st.session_state.uploaded_files["marksheet"].getbuffer())
             marks_path = tmp_marks.name
 
         # Process certificates
         cert_paths = []
         for cert in st.session_state.uploaded_files["certificates"]:
             with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_cert:
-                tmp_cert.write(cert.read())
+                tmp_cert.write(cert.getbuffer())
                 cert_paths.append(tmp_cert.name)
 
+        # The PDFs are on disk now; don't keep their bytes alive for the rest of the session
+        release_uploads()
+
         # Extract data
         marks = extract_marks_from_pdf(marks_path)
         interests_from_certs = extract_interests_from_certificates(cert_paths) if cert_paths else []
@@ -343,17 +507,66 @@ def build_profile():
         )
         
         st.session_state.profile = profile
-        st.session_state.courses = load_courses()
+        st.session_state.courses = load_courses(sources=st.session_state.get("catalog_sources"))
+        st.session_state.conversation_state = ConversationState(st.session_state.courses)
+        st.session_state.chat_memory = ChatMemory(summarize_fn=summarize_turns)
+        st.session_state.prefetcher = Prefetcher() if PREFETCH_ENABLED else None
 
         # Generate initial recommendation
-        response = get_recommendation_with_context(profile, st.session_state.courses, [])
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        response, pending = get_recommendation_with_deadline(profile, st.session_state.courses, [],
+                                                             deadline_ms=RESPONSE_DEADLINE_MS)
+        st.session_state.messages.append(assistant_message(response))
+        if pending is not None:
+            st.session_state.pending_response = (len(st.session_state.messages) - 1, pending)
 
         # Clean up temp files
         os.unlink(marks_path)
         for path in cert_paths:
             os.unlink(path)
 
+@lru_cache(maxsize=256)
+def profile_sidebar_html(marks_items, strengths, interests, aspiration):
+    """Profile summary cards as one HTML fragment, rebuilt only when the profile changes"""
+    if marks_items:
+        # Top 3 subjects by score, keeping the score data
+        top_strengths = sorted(marks_items, key=lambda x: x[1], reverse=True)[:3]
+    else:
+        # Fallback to strengths without scores
+        top_strengths = [(strength, None) for strength in strengths[:3]]
+
+    items = []
+    for i, (strength, score) in enumerate(top_strengths, 1):
+        label = f"{i}. {html.escape(str(strength))}" + (f" ({score}%)" if score is not None else "")
+        items.append(f'<div class="strength-item">{label}</div>')
+    if not items:
+        items.append('<div class="strength-item">No strengths data available</div>')
+
+    return "\n".join([
+        '<div class="profile-card"><p><strong>🎯 Top Strengths:</strong></p>', *items, '</div>',
+        '<div class="profile-card"><p><strong>🌟 Interests:</strong></p>',
+        f'<p>{html.escape(", ".join(interests)) if interests else "Not specified"}</p></div>',
+        '<div class="profile-card"><p><strong>🚀 Career Goal:</strong></p>',
+        f'<p>{html.escape(aspiration) if aspiration else "Not specified"}</p></div>'
+    ])
+
+def render_history():
+    """Render the most recent messages; older ones stay collapsed until paged in"""
+    messages = st.session_state.messages
+    shown = RENDER_RECENT_MESSAGES * st.session_state.get("history_pages", 1)
+    hidden = max(0, len(messages) - shown)
+    if hidden:
+        if st.button(f"⬆️ Show earlier messages ({hidden} hidden)", key="show_earlier"):
+            st.session_state.history_pages = st.session_state.get("history_pages", 1) + 1
+            st.rerun()
+    for msg in messages[hidden:]:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
+def compact_messages():
+    """Cap the stored history, folding older turns into the chat memory summary"""
+    compact_history(st.session_state.messages, MAX_SESSION_MESSAGES,
+                    st.session_state.get("conversation_state"), st.session_state.get("chat_memory"))
+
 def chat_page():
     """Main chat interface with improved sidebar"""
     st.title("🎓 AI Course Advisor Chat")
@@ -363,48 +576,22 @@ def chat_page():
         st.markdown("### 📊 Your Profile Summary")
         
         if st.session_state.profile:
-            # Get top 3 subjects (strengths) from marks
-            marks_data = st.session_state.profile.get("marks_data", {})
-            if marks_data:
-                # Sort subjects by score in descending order
-                sorted_subjects = sorted(marks_data.items(), key=lambda x: x[1], reverse=True)
-                top_strengths = sorted_subjects[:3]  # Keep the score data
-            else:
-                # Fallback to strengths without scores
-                strengths_list = st.session_state.profile.get("strengths", [])
-                top_strengths = [(strength, None) for strength in strengths_list[:3]]
-            
-            st.markdown('<div class="profile-card">', unsafe_allow_html=True)
-            st.markdown("**🎯 Top Strengths:**")
-            if top_strengths:
-                for i, (strength, score) in enumerate(top_strengths, 1):
-                    if score is not None:
-                        st.markdown(f'<div class="strength-item">{i}. {strength} ({score}%)</div>', unsafe_allow_html=True)
-                    else:
-                        st.markdown(f'<div class="strength-item">{i}. {strength}</div>', unsafe_allow_html=True)
-            else:
-                st.markdown('<div class="strength-item">No strengths data available</div>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            st.markdown('<div class="profile-card">', unsafe_allow_html=True)
-            st.markdown("**🌟 Interests:**")
-            interests = st.session_state.profile.get("interests", [])
-            if interests:
-                st.write(", ".join(interests))
-            else:
-                st.write("Not specified")
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            st.markdown('<div class="profile-card">', unsafe_allow_html=True)
-            st.markdown("**🚀 Career Goal:**")
-            aspiration = st.session_state.profile.get("aspiration", "")
-            st.write(aspiration if aspiration else "Not specified")
-            st.markdown('</div>', unsafe_allow_html=True)
+            profile = st.session_state.profile
+            st.markdown(profile_sidebar_html(
+                tuple((profile.get("marks_data") or {}).items()),
+                tuple(profile.get("strengths", [])),
+                tuple(profile.get("interests", [])),
+                profile.get("aspiration", "")
+            ), unsafe_allow_html=True)
             
             st.markdown("---")
             if st.button("🔄 Start Over", use_container_width=True):
-                # Reset everything
-                for key in ["page", "profile", "courses", "messages", "uploaded_files", "assessment_responses"]:
+                # Reset everything, including the stored session
+                if st.session_state.get("session_token"):
+                    get_session_store().delete(st.session_state.session_token)
+                    st.query_params.clear()
+                session_memory.forget_session(st.session_state.get("memory_id"))
+                for key in ["page", "profile", "courses", "messages", "uploaded_files", "assessment_responses", "conversation_state", "chat_memory", "pending_response", "prefetcher", "session_token", "history_pages"]:
                     if key in st.session_state:
                         del st.session_state[key]
                 st.session_state.page = "upload"
@@ -412,16 +599,42 @@ def chat_page():
 
     # Chat interface
     # Display chat history
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
+    render_history()
+
+    # Swap a deadline fallback for the LLM answer once it arrives
+    if st.session_state.get("pending_response"):
+        index, future = st.session_state.pending_response
+        with st.spinner("Preparing a more detailed answer..."):
+            late = resolve_pending(future, LATE_ANSWER_TIMEOUT)
+        del st.session_state.pending_response
+        if late:
+            old_message = st.session_state.messages[index]
+            st.session_state.messages[index] = assistant_message(late)
+            # The replaced message may have been taken as the initial recommendation
+            if st.session_state.get("conversation_state"):
+                st.session_state.conversation_state.replace_message(index, old_message,
+                                                                    st.session_state.messages[index])
+            persist_session()
+            st.rerun()
+        else:
+            # The LLM answer failed or never came; stop promising it
+            message = st.session_state.messages[index]
+            st.session_state.messages[index] = dict(message, content=expire_pending_note(message["content"]))
+            persist_session()
+            st.rerun()
+
+    # Warm up answers to likely follow-ups while the student reads the recommendation
+    prefetcher = st.session_state.get("prefetcher")
+    if prefetcher is not None:
+        prefetcher.prefetch_after(st.session_state.profile, st.session_state.courses, st.session_state.messages)
 
     # Chat input
     prompt = st.chat_input("Ask me anything about the courses suggested or your academic future!")
 
     if prompt:
-        # Add user message to history
+        # Add user message to history, collapsing any paged-in older messages again
         st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.history_pages = 1
         
         # Display user message
         with st.chat_message("user"):
@@ -430,28 +643,85 @@ def chat_page():
         # Generate and display assistant response with typing animation
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
-                # Generate response with full context
-                response = get_recommendation_with_context(
-                    st.session_state.profile, 
-                    st.session_state.courses, 
-                    st.session_state.messages
-                )
+                # A prefetched answer to a predicted follow-up is served instantly
+                pending = None
+                response = None
+                if prefetcher is not None:
+                    response = prefetcher.lookup(st.session_state.messages, st.session_state.conversation_state)
+                if response is None:
+                    # Generate response with full context
+                    response, pending = get_recommendation_with_deadline(
+                        st.session_state.profile, 
+                        st.session_state.courses, 
+                        st.session_state.messages,
+                        st.session_state.get("conversation_state"),
+                        st.session_state.get("chat_memory"),
+                        deadline_ms=RESPONSE_DEADLINE_MS
+                    )
             
             # Display with typing animation
             response_container = st.empty()
             display_typing_animation(response, response_container)
 
         # Add assistant response to history
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        st.session_state.messages.append(assistant_message(response))
+        compact_messages()
+        persist_session()
+        if pending is not None:
+            st.session_state.pending_response = (len(st.session_state.messages) - 1, pending)
+            st.rerun()
+
+def record_memory_usage():
+    """Account this session's memory for the admin view (shared catalog objects aren't counted).
+
+    The walk is O(session state), so it only runs when the admin view exists,
+    and at most once per MEMORY_RECORD_INTERVAL per session.
+    """
+    if not ADMIN_TOKEN:
+        return
+    now = time.time()
+    if now - st.session_state.get("memory_recorded_at", 0) < MEMORY_RECORD_INTERVAL:
+        return
+    st.session_state.memory_recorded_at = now
+    memory_id = st.session_state.setdefault("memory_id", new_token())
+    state = st.session_state.get("conversation_state")
+    shared = [st.session_state.get("courses"), state.detector if state else None]
+    sizes = session_memory.session_sizes(st.session_state, shared=shared)
+    session_memory.record_session(memory_id, sizes)
+
+def admin_page():
+    """Per-session memory usage across this server process"""
+    st.title("🛠️ Session Memory")
+    sessions = session_memory.all_sessions()
+    st.metric("Active sessions", len(sessions))
+    st.metric("Total session memory", f"{sum(row[1] for row in sessions) / 1024:.1f} KiB")
+    st.table([
+        {
+            "session": session_id[:8],
+            "KiB": round(total / 1024, 1),
+            "largest keys": ", ".join(f"{key} ({size / 1024:.1f})" for key, size in list(sizes.items())[:3]),
+            "last seen": time.strftime("%H:%M:%S", time.localtime(updated))
+        }
+        for session_id, total, sizes, updated in sessions
+    ])
+    allocations = session_memory.top_allocations()
+    if allocations:
+        st.markdown("### Top allocation sites")
+        st.table([{"location": location, "KiB": round(kib, 1), "blocks": blocks}
+                  for location, kib, blocks in allocations])
 
 # Main app routing
 def main():
+    if ADMIN_TOKEN and st.query_params.get("admin") == ADMIN_TOKEN:
+        admin_page()
+        return
     if st.session_state.page == "upload":
         upload_page()
     elif st.session_state.page == "assessment":
         assessment_page()
     elif st.session_state.page == "chat":
         chat_page()
+    record_memory_usage()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,153 @@
+# app_logging.py - Leveled, structured logging with a non-blocking queue handler
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+ROOT_LOGGER = "advisor"
+
+_listener = None
+
+def get_logger(name):
+    """Logger under the shared 'advisor' namespace"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; structured fields go in extra={"fields": {...}}"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class PlainFormatter(logging.Formatter):
+    """Human-readable lines for local runs, with structured fields appended"""
+
+    def format(self, record):
+        line = f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records below WARNING for chatty loggers.
+
+    rates maps a logger name prefix to the fraction kept, e.g.
+    {"advisor.scraper": 0.1}. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+def parse_sample_rates(value):
+    """'advisor.scraper=0.1,advisor.crawler=0.5' -> {"advisor.scraper": 0.1, ...}"""
+    rates = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+def configure_logging(level=None, json_output=None, sample_rates=None, stream=None, force=False):
+    """Route 'advisor.*' logs through a queue so callers never block on I/O.
+
+    Defaults come from LOG_LEVEL (WARNING), LOG_FORMAT (plain or json) and
+    LOG_SAMPLE (per-logger sampling rates). Later calls are no-ops unless
+    force=True, so Streamlit reruns keep the running listener.
+    """
+    global _listener
+
+    root = logging.getLogger(ROOT_LOGGER)
+    if _listener is not None and not force:
+        return root
+
+    level = level or os.getenv("LOG_LEVEL", "WARNING")
+    if json_output is None:
+        json_output = os.getenv("LOG_FORMAT", "plain").lower() == "json"
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE"))
+
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else PlainFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    if sample_rates:
+        # Sample before enqueueing so dropped records cost nothing downstream
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return root
+
+def configure_worker_logging(level=None, json_output=None):
+    """Log straight to stderr in a worker process.
+
+    A forked worker inherits the parent's queue handler but not its listener
+    thread, so anything it logged would sit in the queue unread. Workers exit
+    without running atexit, so they write directly instead of queueing.
+    """
+    global _listener
+
+    _listener = None
+    level = level or os.getenv("LOG_LEVEL", "WARNING")
+    if json_output is None:
+        json_output = os.getenv("LOG_FORMAT", "plain").lower() == "json"
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else PlainFormatter())
+    sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE"))
+    if sample_rates:
+        output.addFilter(SamplingFilter(sample_rates))
+    root.addHandler(output)
+    return root
+
+def shutdown_logging():
+    """Flush queued records (registered at exit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
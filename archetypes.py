@@ -0,0 +1,65 @@
+# archetypes.py - Lookup table of precomputed initial recommendations per profile archetype
+import json
+import os
+from functools import lru_cache
+
+from catalog import catalog_fingerprint
+
+ARCHETYPES_PATH = os.getenv("ARCHETYPES_PATH", "archetypes.json")
+
+# Placeholders the stored rationale templates use for the personalized parts
+PLACEHOLDERS = ("{strengths}", "{aspiration}")
+
+def archetype_key(profile):
+    """Degree level x interests x activities: everything course ranking depends on"""
+    return "|".join([
+        profile.get("degree_level", "Bachelor's Degree"),
+        ",".join(sorted(profile.get("interests", []))),
+        ",".join(sorted(profile.get("activities", [])))
+    ])
+
+def save_table(entries, fingerprint, path=ARCHETYPES_PATH):
+    """Write the table atomically so a running app never reads a partial file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"catalog_fingerprint": fingerprint, "entries": entries}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+@lru_cache(maxsize=2)
+def _load_table(path, mtime):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_table(path=ARCHETYPES_PATH):
+    """The precomputed table, reloaded only when the file changes (None if absent)"""
+    if not os.path.exists(path):
+        return None
+    return _load_table(path, os.path.getmtime(path))
+
+def render_entry(entry, profile):
+    """Fill the personalized parts of a stored rationale template"""
+    strengths = profile.get("strengths") or []
+    aspiration = (profile.get("aspiration") or "").strip()
+
+    text = entry["template"]
+    text = text.replace("{strengths}", ", ".join(strengths) if strengths else "your favourite subjects")
+    text = text.replace("{aspiration}", aspiration or "your goals")
+    if aspiration and "{aspiration}" not in entry["template"]:
+        text = f"You told us: *\"{aspiration}\"*. Here's where that could lead.\n\n" + text
+    return text
+
+def lookup_initial_recommendation(profile, courses, path=ARCHETYPES_PATH):
+    """Precomputed recommendation for the profile's archetype, or None.
+
+    Profiles that still need clarification are never served from the table,
+    and entries built against a different catalog are ignored.
+    """
+    if profile.get("needs_clarification"):
+        return None
+    table = load_table(path)
+    if not table or table.get("catalog_fingerprint") != catalog_fingerprint(courses):
+        return None
+    entry = table["entries"].get(archetype_key(profile))
+    if entry is None:
+        return None
+    return render_entry(entry, profile)
@@ -0,0 +1,208 @@
+# batch_advisor.py - Offline advising for many students from a folder of PDFs and a CSV of answers
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from profile_builder import extract_marks_from_pdf, extract_interests_from_certificates, build_student_profile
+from course_matcher import load_courses, get_recommendation_with_context, is_error_response
+from app_logging import configure_logging, configure_worker_logging, get_logger
+
+OUTPUT_PATH = "batch_results.jsonl"
+
+logger = get_logger("batch_advisor")
+
+# CSV columns; list-valued columns are separated by semicolons
+#   student_id, marksheet, certificates, degree_level,
+#   aspiration (Q2), work_preferences (Q3), interests (Q4), activities (Q5)
+LIST_SEPARATOR = ";"
+
+def split_list(value):
+    return [item.strip() for item in (value or "").split(LIST_SEPARATOR) if item.strip()]
+
+def read_answers(csv_path, pdf_dir):
+    """One dict per student; the marksheet defaults to <student_id>.pdf in pdf_dir"""
+    students = []
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            student_id = (row.get("student_id") or "").strip()
+            if not student_id:
+                continue
+            marksheet = (row.get("marksheet") or "").strip() or f"{student_id}.pdf"
+            students.append({
+                "student_id": student_id,
+                "marksheet": os.path.join(pdf_dir, marksheet),
+                "certificates": [os.path.join(pdf_dir, name) for name in split_list(row.get("certificates"))],
+                "degree_level": (row.get("degree_level") or "").strip() or "Bachelor's Degree",
+                "aspiration": row.get("aspiration") or "",
+                "work_preferences": split_list(row.get("work_preferences")),
+                "interests": row.get("interests") or "",
+                "activities": row.get("activities") or ""
+            })
+    return students
+
+def load_checkpoint(output_path):
+    """Student ids that already have a successful result in the output file"""
+    done = set()
+    try:
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted run
+                    continue
+                if record.get("status") == "ok":
+                    done.add(record["student_id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+def parse_student_documents(student):
+    """PDF parsing for one student (runs in a worker process).
+
+    A missing, unreadable or empty marksheet raises, so the student is recorded
+    as an error rather than advised on sample marks.
+    """
+    if not os.path.isfile(student["marksheet"]):
+        raise FileNotFoundError(student["marksheet"])
+    marks = extract_marks_from_pdf(student["marksheet"], sample_fallback=False)
+    if not marks:
+        raise ValueError(f"No marks found in {student['marksheet']}")
+    cert_interests = extract_interests_from_certificates(student["certificates"]) if student["certificates"] else []
+    return marks, cert_interests
+
+class ResultWriter:
+    """Appends one JSON line per student, syncing to disk every few records"""
+
+    def __init__(self, path, sync_every=10):
+        self.file = open(path, "a", encoding="utf-8")
+        self.sync_every = sync_every
+        self.pending = 0
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.pending += 1
+        if self.pending >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+class Progress:
+    def __init__(self, total, report_every):
+        self.total = total
+        self.report_every = report_every
+        self.completed = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+
+    def students_per_minute(self):
+        elapsed = time.perf_counter() - self.started
+        return self.completed / elapsed * 60 if elapsed > 0 else 0.0
+
+    def record(self, ok):
+        self.completed += 1
+        if not ok:
+            self.failed += 1
+        if self.completed % self.report_every == 0 or self.completed == self.total:
+            print(f"   {self.completed}/{self.total} students ({self.failed} failed) - "
+                  f"{self.students_per_minute():.1f} students/min")
+
+async def advise_student(student, courses, loop, pdf_pool, llm_pool, llm_slots, writer, progress):
+    """Parse PDFs in the process pool, then wait for an LLM slot"""
+    record = {"student_id": student["student_id"]}
+    started = time.perf_counter()
+    try:
+        marks, cert_interests = await loop.run_in_executor(pdf_pool, parse_student_documents, student)
+        profile = build_student_profile(
+            marks,
+            cert_interests,
+            student["degree_level"],
+            student["aspiration"],
+            student["work_preferences"],
+            student["interests"],
+            student["activities"]
+        )
+        record["profile"] = profile
+
+        # No one is there to answer clarifying questions, so recommend with what we have
+        async with llm_slots:
+            response = await loop.run_in_executor(
+                llm_pool, get_recommendation_with_context, dict(profile, needs_clarification=False), courses, []
+            )
+        record["recommendation"] = response
+        record["status"] = "error" if is_error_response(response) else "ok"
+    except Exception as e:
+        logger.warning("Student %s failed: %s", student["student_id"], type(e).__name__)
+        record["status"] = "error"
+        record["error"] = type(e).__name__
+
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    writer.write(record)
+    progress.record(record["status"] == "ok")
+
+async def run_batch(students, courses, writer, workers, llm_concurrency, report_every):
+    loop = asyncio.get_running_loop()
+    progress = Progress(len(students), report_every)
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    # Workers log to stderr directly; the parent's queue listener doesn't survive the fork
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_worker_logging) as pdf_pool, \
+         ThreadPoolExecutor(max_workers=llm_concurrency) as llm_pool:
+        await asyncio.gather(*(
+            advise_student(student, courses, loop, pdf_pool, llm_pool, llm_slots, writer, progress)
+            for student in students
+        ))
+    return progress
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch course recommendations for many students")
+    parser.add_argument("pdf_dir", help="Directory with marksheet and certificate PDFs")
+    parser.add_argument("answers", help="CSV of questionnaire answers, one row per student")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="JSONL file results are appended to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Processes for PDF parsing")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Maximum LLM calls in flight")
+    parser.add_argument("--resume", action="store_true", help="Skip students that already have a result")
+    parser.add_argument("--limit", type=int, default=None, help="Only process the first N students")
+    parser.add_argument("--report-every", type=int, default=25)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging()
+
+    students = read_answers(args.answers, args.pdf_dir)
+    if args.resume:
+        done = load_checkpoint(args.output)
+        students = [s for s in students if s["student_id"] not in done]
+        print(f"♻️ Resuming: {len(done)} student(s) already advised")
+    if args.limit is not None:
+        students = students[:args.limit]
+
+    courses = load_courses()
+    print(f"🚀 Advising {len(students)} students ({args.workers} PDF workers, {args.llm_concurrency} LLM slots)")
+
+    writer = ResultWriter(args.output)
+    try:
+        progress = asyncio.run(run_batch(students, courses, writer, args.workers,
+                                         args.llm_concurrency, args.report_every))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - progress.started
+    print(f"\n✅ BATCH COMPLETE")
+    print(f"📊 {progress.completed - progress.failed} succeeded, {progress.failed} failed in {elapsed:.1f}s")
+    print(f"⚡ Throughput: {progress.students_per_minute():.1f} students/min")
+    print(f"💾 Results in {args.output}")
+
+if __name__ == "__main__":
+    main()
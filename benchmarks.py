@@ -0,0 +1,243 @@
+# benchmarks.py - Benchmarks for scraper, profile builder and matcher hot paths
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+RESULTS_PATH = "benchmark_results.jsonl"
+FIXTURES_DIR = "bench_fixtures"
+
+# ---------- Synthetic fixtures ----------
+
+def make_course_page_html(sections=200, links_per_section=20, seed=0):
+    """A large course page with navigation chrome, sections, lists and tables"""
+    rng = random.Random(seed)
+    words = ("accounting finance economics marketing taxation banking graphic design animation "
+             "physiology anatomy statistics semester curriculum placement eligibility duration").split()
+    parts = ['<html><head><title>B.Com Honours | JAIN (Deemed-to-be University)</title>'
+             '<style>.x{}</style><script>var a=1;</script></head><body>',
+             '<header><nav class="main-nav"><ul>' + ''.join(f'<li><a href="/nav{i}">Nav {i}</a></li>' for i in range(100)) + '</ul></nav></header>',
+             '<main>']
+    for s in range(sections):
+        parts.append(f'<h2>Semester {s % 8 + 1}</h2><p>{" ".join(rng.choice(words) for _ in range(80))}</p><ul>')
+        for l in range(links_per_section):
+            parts.append(f'<li><a href="/program/course-{s}-{l}">Bachelor of {rng.choice(words).title()} Program {l}</a></li>')
+        parts.append('</ul>')
+    parts.append('<table>' + ''.join(f'<tr><td>Semester {i}</td><td>{rng.choice(words)}</td></tr>' for i in range(1, 9)) + '</table>')
+    parts.append('</main><footer class="site-footer">' + 'footer ' * 500 + '</footer></body></html>')
+    return "".join(parts)
+
+def make_marksheet_pdf(path, pages=5, lines_per_page=40, seed=0):
+    """Write a minimal multi-page text PDF that looks like a marksheet"""
+    rng = random.Random(seed)
+    subjects = ["Mathematics", "Physics", "Chemistry", "English", "Computer Science", "Biology",
+                "Economics", "Accountancy", "Business Studies", "Physical Education"]
+    objects = []
+    page_ids = []
+    font_id = 3
+    objects.append(None)  # 1: catalog
+    objects.append(None)  # 2: pages
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for _ in range(pages):
+        lines = [f"{rng.choice(subjects)}: {rng.randint(35, 99)}%" for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 14 TL 50 780 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        content_id = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode("latin-1"))
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>".encode("latin-1")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1"))
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode("latin-1"))
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+
+    with open(path, "wb") as f:
+        f.write(out.getvalue())
+    return path
+
+def make_catalog(size, seed=0):
+    """Synthetic catalog shaped like courses.json, scaled to size"""
+    rng = random.Random(seed)
+    prefixes = ["Bachelor of", "B.Com in", "B.Des in", "BSc in", "Master of", "M.Des in", "M.Com in"]
+    fields = ["Commerce", "Finance", "Accounting", "Graphic Design", "Animation", "Sports Science",
+              "Business Management", "Marketing", "Physical Education", "UI UX Design", "Data Analytics"]
+    degrees = ["Commerce & Management Programs", "Design & Creative Programs",
+               "Sports & Physical Education Programs", "General Programs"]
+    catalog = []
+    for i in range(size):
+        field = rng.choice(fields)
+        catalog.append({
+            "course": f"{rng.choice(prefixes)} {field} {i}",
+            "degree": rng.choice(degrees),
+            "subjects": rng.sample(fields, 4),
+            "source_url": f"https://example.edu/program/{i}",
+            "catalog_source": "example.edu"
+        })
+    return catalog
+
+SAMPLE_PROFILE = {
+    "degree_level": "Bachelor's Degree",
+    "interests": ["Business", "Design"],
+    "activities": ["Leadership", "Creative Arts"],
+    "derived_skills": ["Leadership", "Creativity"],
+    "strengths": ["Mathematics", "Economics", "English"],
+    "aspiration": "I want to start a design-led business",
+    "completeness_score": 90,
+    "needs_clarification": False
+}
+
+# ---------- Harness ----------
+
+def run_benchmark(func, repeat=5, number=1):
+    """Best-of timings: returns per-call seconds for each repeat"""
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()  # warm-up
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            timings.append((time.perf_counter() - started) / number)
+    return timings
+
+def collect_benchmarks(quick=False):
+    """(name, callable, repeat) for every benchmark"""
+    from scraper import remove_navigation_elements, extract_subjects_from_body, get_body_content, extract_course_details
+    from profile_builder import extract_marks_from_pdf, build_student_profile
+    from course_matcher import filter_and_match_courses, prepare_initial_prompt
+
+    benchmarks = []
+
+    # Scraper: synthetic plus any recorded pages in bench_fixtures/
+    pages = {"synthetic_large": make_course_page_html(sections=50 if quick else 200)}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages[os.path.splitext(os.path.basename(path))[0]] = f.read()
+
+    for page_name, html in pages.items():
+        benchmarks.append((f"scraper.remove_navigation_elements[{page_name}]",
+                           lambda html=html: remove_navigation_elements(BeautifulSoup(html, "html.parser")), 3))
+        body = get_body_content(remove_navigation_elements(BeautifulSoup(html, "html.parser")))
+        benchmarks.append((f"scraper.extract_subjects_from_body[{page_name}]",
+                           lambda body=body: extract_subjects_from_body(body), 5))
+        benchmarks.append((f"scraper.extract_course_details[{page_name}]",
+                           lambda body=body: extract_course_details(body), 3))
+
+    # Profile builder: synthetic multi-page marksheets plus recorded PDFs
+    pdf_dir = tempfile.mkdtemp(prefix="bench_pdfs_")
+    pdfs = {f"synthetic_{n}p": make_marksheet_pdf(os.path.join(pdf_dir, f"marks_{n}.pdf"), pages=n)
+            for n in ([1, 5] if quick else [1, 5, 20])}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.pdf"))):
+        pdfs[os.path.splitext(os.path.basename(path))[0]] = path
+    for pdf_name, path in pdfs.items():
+        benchmarks.append((f"profile_builder.extract_marks_from_pdf[{pdf_name}]",
+                           lambda path=path: extract_marks_from_pdf(path), 3))
+
+    marks = {"Mathematics": 91, "Physics": 84, "Economics": 77, "English": 88, "Art": 95}
+    benchmarks.append(("profile_builder.build_student_profile",
+                       lambda: build_student_profile(marks, ["Design"], "Bachelor's Degree",
+                                                     "I want to design products that help people every day",
+                                                     ["Creative Tools"],
+                                                     "I love graphic design, animation and business studies",
+                                                     "President of the art club and organized exhibitions"), 5))
+
+    # Matcher: scaled-up catalogs
+    for size in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        catalog = make_catalog(size)
+        repeat = 3 if size >= 100000 else 5
+        benchmarks.append((f"course_matcher.filter_and_match_courses[{size}]",
+                           lambda catalog=catalog: filter_and_match_courses(catalog, SAMPLE_PROFILE), repeat))
+        benchmarks.append((f"course_matcher.prepare_initial_prompt[{size}]",
+                           lambda catalog=catalog: prepare_initial_prompt(SAMPLE_PROFILE, catalog), repeat))
+
+    return benchmarks
+
+def load_previous_results(path=RESULTS_PATH):
+    """Latest recorded median for each benchmark"""
+    previous = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                previous[record["name"]] = record
+    except FileNotFoundError:
+        pass
+    return previous
+
+def current_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run hot-path benchmarks and track results over time")
+    parser.add_argument("--quick", action="store_true", help="Smaller fixtures for a fast smoke run")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--results", default=RESULTS_PATH, help="JSONL history of benchmark results")
+    parser.add_argument("--no-save", action="store_true", help="Don't append results to the history")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown vs. last run that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    previous = load_previous_results(args.results)
+    commit = current_commit()
+    regressions = []
+    records = []
+
+    print(f"{'benchmark':<64}{'median ms':>11}{'min ms':>10}{'vs last':>10}")
+    print("-" * 95)
+    for name, func, repeat in collect_benchmarks(args.quick):
+        if args.filter not in name:
+            continue
+        timings = run_benchmark(func, repeat=repeat)
+        median = statistics.median(timings)
+        change = ""
+        if name in previous:
+            ratio = median / previous[name]["median"] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > args.threshold:
+                regressions.append((name, ratio))
+                change += " ⚠️"
+        print(f"{name:<64}{median * 1000:>11.2f}{min(timings) * 1000:>10.2f}{change:>10}")
+        records.append({"name": name, "median": median, "min": min(timings), "repeat": repeat,
+                        "commit": commit, "timestamp": time.time(), "python": sys.version.split()[0]})
+
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"\n💾 Appended {len(records)} results to {args.results}")
+
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for name, ratio in regressions:
+            print(f"  {name}: {ratio:+.0%}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
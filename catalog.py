@@ -0,0 +1,145 @@
+# catalog.py - Per-source course catalog shards with lazy loading
+import hashlib
+import json
+import os
+from functools import lru_cache
+from urllib.parse import urlparse
+
+CATALOG_DIR = "catalogs"
+INDEX_FILE = "index.json"
+
+_fingerprints = {}
+
+def shard_name_for_url(url):
+    """Shard key for a URL: its domain without a leading www."""
+    netloc = urlparse(url).netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    return netloc or "unknown"
+
+def shard_path(shard_name, directory=CATALOG_DIR):
+    return os.path.join(directory, f"{shard_name}.json")
+
+def write_shards(courses_by_shard, directory=CATALOG_DIR):
+    """Write one catalog file per shard and refresh the shard index"""
+    os.makedirs(directory, exist_ok=True)
+
+    for shard_name, courses in courses_by_shard.items():
+        path = shard_path(shard_name, directory)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(courses, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    return update_index({name: len(courses) for name, courses in courses_by_shard.items()}, directory)
+
+def update_index(course_counts, directory=CATALOG_DIR):
+    """Record the given shards and their course counts in the shard index"""
+    index = read_index(directory)
+    for shard_name, count in course_counts.items():
+        index[shard_name] = {"file": os.path.basename(shard_path(shard_name, directory)), "courses": count}
+
+    with open(os.path.join(directory, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+    return index
+
+def read_index(directory=CATALOG_DIR):
+    """Read the shard index, or an empty one if no shards were written yet"""
+    try:
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def shard_catalog_file(path="courses.json", directory=CATALOG_DIR):
+    """Split an existing single-file catalog into shards by course URL domain"""
+    with open(path, "r", encoding="utf-8") as f:
+        courses = json.load(f)
+
+    courses_by_shard = {}
+    for course in courses:
+        shard_name = course.get("catalog_source") or shard_name_for_url(course.get("source_url", ""))
+        courses_by_shard.setdefault(shard_name, []).append(course)
+
+    return write_shards(courses_by_shard, directory)
+
+@lru_cache(maxsize=64)
+def _load_shard(path, mtime):
+    # mtime is part of the cache key so a re-scraped shard is picked up
+    with open(path, "r", encoding="utf-8") as f:
+        return tuple(json.load(f))
+
+def load_shard(shard_name, directory=CATALOG_DIR):
+    """Load a single shard, shared read-only between sessions"""
+    path = shard_path(shard_name, directory)
+    return _load_shard(path, os.path.getmtime(path))
+
+def parse_sources(value):
+    """Comma-separated source URLs/domains (as in CATALOG_SOURCES) as a list"""
+    return [s.strip() for s in (value or "").split(",") if s.strip()]
+
+def resolve_sources(sources=None, directory=CATALOG_DIR):
+    """Map source URLs/domains to the shard names a session needs.
+
+    A domain also selects its subdomains' shards, so an institution's
+    domain ("jainuniversity.ac.in") covers all of its sites.
+    """
+    if sources is None:
+        sources = parse_sources(os.getenv("CATALOG_SOURCES", ""))
+    if not sources:
+        return sorted(read_index(directory))
+
+    known = sorted(read_index(directory))
+    shard_names = []
+    for source in sources:
+        shard_name = shard_name_for_url(source) if "://" in source else shard_name_for_url(f"//{source}")
+        matches = [name for name in known if name == shard_name or name.endswith("." + shard_name)]
+        for name in matches or [shard_name]:
+            if name not in shard_names:
+                shard_names.append(name)
+    return shard_names
+
+@lru_cache(maxsize=16)
+def _combined_catalog(shard_files):
+    courses = []
+    for path, mtime in shard_files:
+        courses.extend(_load_shard(path, mtime))
+    return courses
+
+def load_catalog(sources=None, directory=CATALOG_DIR):
+    """Load only the shards for the given sources (all shards if none are given).
+
+    Sessions asking for the same sources share one list, so treat it as read-only.
+    """
+    shard_files = []
+    for shard_name in resolve_sources(sources, directory):
+        path = shard_path(shard_name, directory)
+        try:
+            shard_files.append((path, os.path.getmtime(path)))
+        except FileNotFoundError:
+            continue
+    return _combined_catalog(tuple(shard_files))
+
+def has_shards(directory=CATALOG_DIR):
+    return bool(read_index(directory))
+
+def catalog_fingerprint(courses):
+    """Short hash of the catalog's titles and URLs, computed once per loaded list"""
+    cached = _fingerprints.get(id(courses))
+    if cached and cached[0] is courses:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    for course in courses:
+        digest.update(f"{course.get('course', '')}\t{course.get('source_url', '')}\n".encode("utf-8"))
+    fingerprint = digest.hexdigest()[:16]
+    if len(_fingerprints) >= 16:
+        _fingerprints.pop(next(iter(_fingerprints)))
+    _fingerprints[id(courses)] = (courses, fingerprint)
+    return fingerprint
+
+if __name__ == "__main__":
+    index = shard_catalog_file()
+    for shard_name, info in sorted(index.items()):
+        print(f"  {shard_name}: {info['courses']} courses")
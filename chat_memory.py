@@ -0,0 +1,157 @@
+# chat_memory.py - Rolling window of chat turns with summarization under a token budget
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# LLM summaries are written off the request path; turns use an extractive summary meanwhile
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summarize")
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+def extractive_summary(previous_summary, messages, max_chars=600):
+    """Summary without an LLM call: the first sentence of each older message"""
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        content = " ".join(message.get("content", "").split())
+        first_sentence = re.split(r"(?<=[.!?])\s", content, maxsplit=1)[0][:160]
+        speaker = "Student" if message.get("role") == "user" else "Advisor"
+        lines.append(f"{speaker}: {first_sentence}")
+    summary = "\n".join(lines)
+    # Keep the most recent part when the summary itself grows too long
+    return summary[-max_chars:]
+
+def prior_turns(chat_history):
+    """The history without the latest user message (that one is sent as the turn itself)"""
+    return chat_history[:-1] if chat_history and chat_history[-1].get("role") == "user" else chat_history
+
+class ChatMemory:
+    """Per-session message window for the message-list chat mode.
+
+    Recent turns are sent verbatim. When they exceed token_budget, the
+    oldest turns are folded into a running summary until they fit in
+    low_water, so folding happens in batches every few turns rather than on
+    every turn. The fold itself is extractive and instant; summarize_fn, if
+    given, rewrites the summary in the background for later turns.
+    """
+
+    def __init__(self, token_budget=1200, min_recent=2, summarize_fn=None, max_summary_chars=600,
+                 low_water=None):
+        self.token_budget = token_budget
+        self.low_water = token_budget // 2 if low_water is None else low_water
+        self.min_recent = min_recent
+        self.summarize_fn = summarize_fn
+        self.max_summary_chars = max_summary_chars
+        self.summary = ""
+        self.summarized_upto = 0
+        self.lock = threading.Lock()
+        self.revision = 0
+        self.pending_summary = None
+
+    def snapshot(self):
+        """Plain-data copy of the running summary for persisting a session"""
+        return {"summary": self.summary, "summarized_upto": self.summarized_upto}
+
+    def restore(self, snapshot):
+        with self.lock:
+            self.summary = snapshot.get("summary", "")
+            self.summarized_upto = snapshot.get("summarized_upto", 0)
+            self.revision += 1
+        return self
+
+    def copy(self):
+        """Private copy for a worker thread; its folds don't touch this memory"""
+        clone = ChatMemory(self.token_budget, self.min_recent, self.summarize_fn, self.max_summary_chars,
+                           self.low_water)
+        clone.summary = self.summary
+        clone.summarized_upto = self.summarized_upto
+        return clone
+
+    def forget(self, chat_history, count):
+        """Fold the oldest count messages into the summary before they are dropped"""
+        if count > self.summarized_upto:
+            self._summarize(chat_history[self.summarized_upto:count])
+            self.summarized_upto = count
+        self.summarized_upto -= count
+        return self
+
+    def window(self, chat_history):
+        """Messages to send verbatim, summarizing older ones first if over budget"""
+        if len(chat_history) < self.summarized_upto:
+            # History was reset
+            self.summary = ""
+            self.summarized_upto = 0
+
+        recent = chat_history[self.summarized_upto:]
+        tokens = sum(estimate_tokens(message.get("content", "")) for message in recent)
+
+        overflow = 0
+        if tokens > self.token_budget:
+            # Fold down to the low-water mark so the next few turns fit without folding again
+            while tokens > self.low_water and len(recent) - overflow > self.min_recent:
+                tokens -= estimate_tokens(recent[overflow].get("content", ""))
+                overflow += 1
+
+        if overflow:
+            self._summarize(recent[:overflow])
+            self.summarized_upto += overflow
+            recent = recent[overflow:]
+
+        return list(recent)
+
+    def _summarize(self, messages):
+        """Fold messages into the summary now, and refine it with summarize_fn in the background"""
+        with self.lock:
+            previous = self.summary
+            self.summary = extractive_summary(previous, messages, self.max_summary_chars)
+            self.revision += 1
+            revision = self.revision
+        if self.summarize_fn:
+            self.pending_summary = _summary_pool.submit(self._refine, previous, list(messages), revision)
+
+    def _refine(self, previous, messages, revision):
+        try:
+            summary = self.summarize_fn(previous, messages)
+        except Exception:
+            return
+        if not summary:
+            return
+        with self.lock:
+            # A later fold already moved on from the summary this one was based on
+            if self.revision == revision:
+                self.summary = summary[-self.max_summary_chars:]
+
+    def build_messages(self, system_prompt, chat_history, turn_instructions):
+        """Message list: system prompt, summary of older turns, recent turns, then the current turn.
+
+        The latest user message is replaced by turn_instructions, which already
+        contain the student's question plus any context for answering it.
+        """
+        recent = self.window(prior_turns(chat_history))
+
+        # A single leading system message; some endpoints reject system messages mid-conversation
+        if self.summary:
+            system_prompt = f"{system_prompt}\n\nSummary of the earlier conversation:\n{self.summary}"
+        messages = [{"role": "system", "content": system_prompt}]
+        for message in recent:
+            messages.append({"role": message["role"], "content": message.get("content", "")})
+
+        messages.append({"role": "user", "content": turn_instructions})
+        return messages
+
+def compact_history(chat_history, max_messages, state=None, memory=None):
+    """Drop the oldest messages beyond max_messages in place, keeping state and memory consistent.
+
+    Dropped turns survive in the memory's summary, and the state keeps the
+    initial recommendation separately. Returns how many messages were dropped.
+    """
+    count = len(chat_history) - max_messages
+    if count <= 0:
+        return 0
+    if memory is not None:
+        memory.forget(chat_history, count)
+    if state is not None:
+        state.forget(count)
+    del chat_history[:count]
+    return count
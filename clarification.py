@@ -0,0 +1,142 @@
+# clarification.py - Deterministic clarifying-question stage that runs before the first LLM call
+import re
+
+from profile_builder import (
+    ACTIVITY_INTERESTS, extract_activities_and_skills, extract_interests_from_text, reassess_profile_completeness
+)
+
+# After this many questions we recommend with what we have
+MAX_CLARIFICATION_ROUNDS = 2
+
+# "95/100 in Maths", "Physics: 45 out of 50" - matched first and scaled to a percentage
+FRACTION = r"(\d{1,3})\s*(?:/|out\s+of)\s*(\d{1,4})"
+SCORE_FIRST_FRACTION_PATTERN = re.compile(FRACTION + r"\s*(?:marks\s+)?in\s+([A-Za-z][A-Za-z ]{2,}?)(?=\s*(?:[,.;]|\band\b|$))")
+FRACTION_PATTERN = re.compile(r"([A-Za-z][A-Za-z &]{2,}?)\s*[:\-=]?\s*" + FRACTION)
+
+# "Maths 90", "Physics: 85%" and "92 in Chemistry"
+MARK_PATTERN = re.compile(r"([A-Za-z][A-Za-z &]{2,}?)\s*[:\-=]?\s*(\d{1,3})\s*%?")
+SCORE_FIRST_PATTERN = re.compile(r"(\d{1,3})\s*%?\s*(?:marks\s+)?in\s+([A-Za-z][A-Za-z ]{2,}?)(?=\s*(?:[,.;]|\band\b|$))")
+
+# School subjects a free-text mark can be for; anything else ("I am 17") isn't a mark
+KNOWN_SUBJECTS = {
+    "mathematics", "maths", "math", "applied mathematics", "physics", "chemistry", "biology", "botany", "zoology",
+    "science", "social science", "social studies", "environmental science", "computer science", "computers",
+    "informatics practices", "information technology", "electronics", "biotechnology", "statistics",
+    "english", "hindi", "kannada", "sanskrit", "tamil", "telugu", "malayalam", "marathi", "urdu", "french",
+    "german", "literature", "accountancy", "accounts", "accounting", "business studies", "economics",
+    "commerce", "entrepreneurship", "history", "geography", "political science", "psychology", "sociology",
+    "legal studies", "home science", "physical education", "art", "fine arts", "painting", "music", "dance"
+}
+MAX_SUBJECT_WORDS = max(len(subject.split()) for subject in KNOWN_SUBJECTS)
+
+def known_subject(text):
+    """The known subject named in a captured phrase ("best in Biology" -> Biology), or None"""
+    words = text.split()
+    lowered = [word.lower() for word in words]
+    best = None
+    for length in range(min(MAX_SUBJECT_WORDS, len(words)), 0, -1):
+        # Rightmost match of the longest length: the subject sits next to its score
+        for start in range(len(words) - length, -1, -1):
+            if " ".join(lowered[start:start + length]) in KNOWN_SUBJECTS:
+                best = " ".join(words[start:start + length])
+                break
+        if best:
+            break
+    return best.title() if best else None
+
+def percentage(score, total):
+    """Scale a "45 out of 50" style score to a percentage (90), or None if it makes no sense"""
+    score, total = int(score), int(total)
+    if total == 0 or score > total:
+        return None
+    return round(score * 100 / total)
+
+def parse_marks(text):
+    """Subject -> percentage pairs from a free-text answer, for known school subjects only"""
+    pairs = [(subject, percentage(score, total)) for score, total, subject in SCORE_FIRST_FRACTION_PATTERN.findall(text)]
+    text = SCORE_FIRST_FRACTION_PATTERN.sub(" ", text)
+    # Score-first forms come out first; otherwise "88 in physics and chemistry 45/50" reads one long subject
+    pairs += [(subject, int(score)) for score, subject in SCORE_FIRST_PATTERN.findall(text)]
+    text = SCORE_FIRST_PATTERN.sub(" ", text)
+    pairs += [(subject, percentage(score, total)) for subject, score, total in FRACTION_PATTERN.findall(text)]
+    text = FRACTION_PATTERN.sub(" ", text)
+    pairs += [(subject, int(score)) for subject, score in MARK_PATTERN.findall(text)]
+
+    marks = {}
+    for subject, score in pairs:
+        subject = known_subject(subject)
+        if subject and score is not None and 0 <= score <= 100:
+            marks[subject] = score
+    return marks
+
+def clarification_pending(profile):
+    """Whether the next assistant turn should be another clarifying question"""
+    return (profile.get("needs_clarification", False)
+            and bool(profile.get("clarifying_questions"))
+            and profile.get("clarification_rounds", 0) < MAX_CLARIFICATION_ROUNDS)
+
+def _known_facts(profile):
+    facts = []
+    if profile.get("strengths"):
+        facts.append(f"your strongest subjects are {', '.join(profile['strengths'])}")
+    if profile.get("interests"):
+        facts.append(f"you're interested in {', '.join(profile['interests'])}")
+    if profile.get("activities"):
+        facts.append(f"you've been involved in {', '.join(profile['activities'])}")
+    if profile.get("aspiration"):
+        facts.append(f'your goal is: *"{profile["aspiration"].strip()}"*')
+    return facts
+
+def render_clarification(profile):
+    """Acknowledgement plus the most important open question, rendered from templates"""
+    degree_level = profile.get("degree_level", "Bachelor's Degree")
+    rounds = profile.get("clarification_rounds", 0)
+    question = profile["clarifying_questions"][0]
+    profile["pending_clarification"] = profile["missing_areas"][0]
+    profile["clarification_rounds"] = rounds + 1
+
+    facts = _known_facts(profile)
+    if rounds == 0:
+        opening = "Thanks for sharing your details! "
+        opening += f"Here's what I know so far: {'; '.join(facts)}." if facts else "I've started building your profile."
+        opening += f"\n\nBefore I suggest {degree_level} courses, I'd like to understand you a little better so my recommendations really fit you."
+    else:
+        opening = "Thanks, that helps! Just one more thing so I can make my suggestions more personal."
+
+    return f"""{opening}
+
+**{question}**
+
+Take your time - the more you tell me, the better I can match you with the right courses. 😊"""
+
+def _merge_interests(profile, text):
+    """Add interests and activities found in free text to the profile"""
+    activities, skills = extract_activities_and_skills(text)
+    implied = [ACTIVITY_INTERESTS[a] for a in activities if a in ACTIVITY_INTERESTS]
+    profile["interests"] = sorted(set(profile.get("interests", [])) | set(extract_interests_from_text(text)) | set(implied))
+    profile["activities"] = sorted(set(profile.get("activities", [])) | set(activities))
+    profile["derived_skills"] = sorted(set(profile.get("derived_skills", [])) | set(skills))
+
+def apply_clarification_answer(profile, answer):
+    """Fold the student's answer into the profile and re-check only the affected areas"""
+    area = profile.pop("pending_clarification", None)
+    answer = (answer or "").strip()
+    if not area or not answer:
+        return profile
+
+    if area == "academic performance data":
+        marks = dict(profile.get("marks_data") or {})
+        marks.update(parse_marks(answer))
+        profile["marks_data"] = marks
+        profile["strengths"] = [subject for subject, _ in sorted(marks.items(), key=lambda x: x[1], reverse=True)[:3]]
+    elif area == "detailed career aspiration":
+        profile["aspiration"] = f"{profile.get('aspiration', '')} {answer}".strip()
+    elif area == "detailed subject preferences":
+        profile["favorite_subjects"] = list(profile.get("favorite_subjects") or []) + [answer]
+    elif area == "extracurricular activities":
+        profile["extra_curricular_details"] = f"{profile.get('extra_curricular_details') or ''} {answer}".strip()
+
+    # Any answer may reveal interests or activities
+    _merge_interests(profile, answer)
+
+    return reassess_profile_completeness(profile, [area, "demonstrated interests from certificates"])
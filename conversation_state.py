@@ -0,0 +1,185 @@
+# conversation_state.py - Incrementally updated per-session conversation state
+import copy
+import re
+
+from course_mentions import get_mention_detector
+
+RECENT_WINDOW = 6  # messages considered "recent" when tracking the current course
+
+# Keywords that indicate they want different options
+ALTERNATIVE_KEYWORDS = [
+    "other options", "different courses", "alternatives", "other courses",
+    "something else", "different options", "more options", "other programs",
+    "different field", "change", "instead", "rather than", "not interested",
+    "don't like", "different area", "explore other", "what else",
+    "any other", "show me other", "different degree", "other majors"
+]
+
+# Follow-up questions about career/jobs/details refer to the current course
+FOLLOWUP_KEYWORDS = [
+    "job opportunities", "career prospects", "employment", "salary", "placement",
+    "subjects", "curriculum", "syllabus", "details", "more about", "tell me about",
+    "how is", "what about", "opportunities", "scope", "future"
+]
+
+# Whole-message small talk that needs no generation, by kind
+SMALLTALK_PHRASES = {
+    "thanks": ["thanks", "thank you", "thank u", "thx", "ty", "thanks a lot", "thank you so much",
+               "thanks that helps", "that helps", "that was helpful", "very helpful"],
+    "greeting": ["hi", "hello", "hey", "hii", "good morning", "good afternoon", "good evening"],
+    "goodbye": ["bye", "goodbye", "see you", "that's all", "thats all", "nothing else"],
+    "acknowledgement": ["ok", "okay", "ok thanks", "okay thanks", "cool", "great", "got it", "nice",
+                        "awesome", "alright", "sure", "perfect", "great thanks"]
+}
+
+def _keyword_pattern(keywords):
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+ALTERNATIVES_PATTERN = _keyword_pattern(ALTERNATIVE_KEYWORDS)
+FOLLOWUP_PATTERN = _keyword_pattern(FOLLOWUP_KEYWORDS)
+
+_SMALLTALK_KINDS = {phrase: kind for kind, phrases in SMALLTALK_PHRASES.items() for phrase in phrases}
+
+def asks_question(message):
+    """Whether a reply ends by asking something ("...Would you like the fees? 😊")"""
+    paragraphs = message.strip().rsplit("\n\n", 1)
+    return "?" in paragraphs[-1]
+
+def smalltalk_kind(message):
+    """Kind of small talk if the whole message is one (e.g. "Thanks!"), else None"""
+    normalized = " ".join(re.sub(r"[^a-z' ]+", " ", message.lower()).split())
+    return _SMALLTALK_KINDS.get(normalized)
+
+class ConversationState:
+    """What the conversation is about, updated once per new message.
+
+    Tracks the course currently being discussed, the initial recommendation
+    and the intent of the latest user message, so building a prompt never
+    rescans the chat history.
+    """
+
+    def __init__(self, courses):
+        self.detector = get_mention_detector(courses)
+        self.reset()
+
+    def reset(self):
+        self.processed = 0
+        self.current_course = None
+        self.current_course_at = -1
+        self.initial_recommendation = None
+        self.latest_user_message = ""
+        self.intent = None
+        self.smalltalk = None
+        self.specific_course = None
+        self.assistant_asked = False
+
+    SNAPSHOT_FIELDS = ("processed", "current_course", "current_course_at", "initial_recommendation",
+                       "latest_user_message", "intent", "smalltalk", "specific_course", "assistant_asked")
+
+    def snapshot(self):
+        """Plain-data copy of the state for persisting a session"""
+        return {field: getattr(self, field) for field in self.SNAPSHOT_FIELDS}
+
+    def restore(self, snapshot):
+        for field in self.SNAPSHOT_FIELDS:
+            if field in snapshot:
+                setattr(self, field, snapshot[field])
+        return self
+
+    def copy(self):
+        """Independent copy for a worker thread (the mention detector is shared)"""
+        return copy.copy(self)
+
+    def forget(self, count):
+        """Shift indices after the oldest count messages were dropped from the history"""
+        self.processed = max(0, self.processed - count)
+        self.current_course_at -= count
+        return self
+
+    def replace_message(self, index, old_message, new_message):
+        """Account for one already-processed message being swapped (a late answer replacing a fallback).
+
+        Only that message's effects are updated; replaying the history could
+        pick a later answer as the initial recommendation once older
+        messages have been compacted away.
+        """
+        old_content = old_message.get("content", "")
+        new_content = new_message.get("content", "")
+        if self.initial_recommendation is not None and self.initial_recommendation == old_content:
+            self.initial_recommendation = new_content
+        if index == self.processed - 1 and new_message.get("role") == "assistant":
+            self.assistant_asked = asks_question(new_content)
+        if index >= self.processed or index < self.current_course_at:
+            return self
+        mention = self.detector.best_mention(new_content)
+        if mention:
+            self.current_course = mention
+            self.current_course_at = index
+        return self
+
+    def update(self, chat_history):
+        """Consume the messages added since the last update"""
+        if len(chat_history) < self.processed:
+            # History was reset; start over
+            self.reset()
+        for message in chat_history[self.processed:]:
+            self._add_message(message)
+        return self
+
+    def _add_message(self, message):
+        index = self.processed
+        self.processed += 1
+
+        role = message.get("role")
+        content = message.get("content", "")
+        mention = self.detector.best_mention(content)
+
+        # Clarifying questions asked before the first recommendation don't count as one
+        if (role == "assistant" and self.initial_recommendation is None and content and len(content) > 100
+                and message.get("kind") != "clarification"):
+            self.initial_recommendation = content
+
+        if role == "user":
+            self.latest_user_message = content
+            self._classify(content, mention, index)
+        elif role == "assistant":
+            self.assistant_asked = asks_question(content)
+
+        if mention:
+            self.current_course = mention
+            self.current_course_at = index
+
+    def _classify(self, content, mention, index):
+        message_lower = content.lower()
+        self.specific_course = None
+        self.smalltalk = smalltalk_kind(content)
+        # "Sure" to "Would you like the fee details?" is an answer, not small talk
+        if self.smalltalk == "acknowledgement" and self.assistant_asked:
+            self.smalltalk = None
+
+        if self.smalltalk:
+            self.intent = "smalltalk"
+        elif ALTERNATIVES_PATTERN.search(message_lower):
+            self.intent = "alternatives"
+        elif mention:
+            self.intent = "specific_course"
+            self.specific_course = mention
+        elif FOLLOWUP_PATTERN.search(message_lower) and self.recent_course(index) is not None:
+            self.intent = "specific_course"
+            self.specific_course = self.recent_course(index)
+        else:
+            self.intent = "followup"
+
+    def recent_course(self, index=None):
+        """Current course, if it was mentioned within the recent window"""
+        if index is None:
+            index = self.processed - 1
+        if self.current_course and index - self.current_course_at < RECENT_WINDOW:
+            return self.current_course
+        return None
+
+    def initial_courses_summary(self):
+        """The initial recommendation excerpt used as context for follow-ups"""
+        if not self.initial_recommendation:
+            return "The courses initially recommended to you"
+        return f"Here's what I initially recommended to you:\n\n{self.initial_recommendation[:800]}..."
@@ -1,68 +1,121 @@
+import contextvars
+import hashlib
 import json
 import os
-import openai
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
 from dotenv import load_dotenv
+from catalog import has_shards, load_catalog
+from course_retrieval import retrieve_course_context
+from course_mentions import get_mention_detector
+from conversation_state import ALTERNATIVES_PATTERN, FOLLOWUP_PATTERN, ConversationState
+from chat_memory import ChatMemory, prior_turns
+from archetypes import lookup_initial_recommendation
+from clarification import apply_clarification_answer, clarification_pending, render_clarification
+from app_logging import get_logger
+from tracing import set_attributes, span, traced
 
 # Load API key from .env
 load_dotenv()
-openai.api_key = os.getenv("MISTRAL_API_KEY")
 
-# Set Mistral endpoint (official API)
-openai.api_base = "https://api.mistral.ai/v1"
+# Connections kept open to the LLM endpoint, shared by all sessions
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
 
-def load_courses(path="courses.json"):
+logger = get_logger("course_matcher")
+
+@lru_cache(maxsize=1)
+def get_openai():
+    """The openai module, imported and pointed at Mistral on first use.
+
+    openai pulls in aiohttp, numpy and pandas helpers, so it isn't imported
+    until a request (or warm-up) needs it. All threads share one pooled
+    HTTP session instead of opening a connection each.
+    """
+    import openai
+    import requests
+
+    openai.api_key = os.getenv("MISTRAL_API_KEY")
+    # Set Mistral endpoint (official API)
+    openai.api_base = os.getenv("MISTRAL_API_BASE", "https://api.mistral.ai/v1")
+
+    class PooledSession(requests.Session):
+        """Shared by every thread. openai closes each thread's session every few
+        minutes (MAX_SESSION_LIFETIME_SECS), which would tear down the pool for
+        all threads, in-flight requests included, so close() is a no-op."""
+
+        def close(self):
+            pass
+
+    session = PooledSession()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=LLM_POOL_SIZE, max_retries=2)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    openai.requestssession = session
+    return openai
+
+def warm_connection(timeout=3.0):
+    """Open a pooled connection to the LLM endpoint ahead of the first request"""
+    openai = get_openai()
+    try:
+        openai.requestssession.get(f"{openai.api_base.rstrip('/')}/models", timeout=timeout,
+                                   headers={"Authorization": f"Bearer {openai.api_key or ''}"})
+        return True
+    except Exception as e:
+        logger.warning("LLM endpoint warm-up failed: %s", type(e).__name__)
+        return False
+
+@lru_cache(maxsize=4)
+def _load_courses_file(path, mtime):
     with open(path, "r") as f:
         return json.load(f)
 
-def extract_current_discussion_course(chat_history):
+@traced("load_courses")
+def load_courses(path="courses.json", sources=None):
+    """Load the course catalog, mapping only the shards for the given sources.
+    
+    The returned list is shared by every session using the same catalog; don't mutate it.
+    """
+    if has_shards():
+        return load_catalog(sources)
+    return _load_courses_file(path, os.path.getmtime(path))
+
+def extract_current_discussion_course(chat_history, courses=None):
     """Extract the specific course currently being discussed"""
-    current_course = None
+    if courses is None:
+        courses = load_courses()
+    detector = get_mention_detector(courses)
     
     # Look through recent messages to find what course is being discussed
     recent_messages = chat_history[-6:] if len(chat_history) > 6 else chat_history
     
     for message in reversed(recent_messages):  # Start from most recent
-        content = message.get("content", "").lower()
-        
-        # Look for course-specific mentions
-        if "b.des in animation" in content or "animation and visual effects" in content:
-            current_course = "B.Des in Animation and Visual Effects"
-            break
-        elif "computer science" in content and "engineering" in content:
-            current_course = "Computer Science and Engineering"
-            break
-        elif "bachelor of technology" in content and "information science" in content:
-            current_course = "Bachelor of Technology in Information Science"
-            break
-        elif "b.com" in content or "commerce" in content:
-            current_course = "Bachelor of Commerce"
-            break
-        # Add more course patterns as needed
+        current_course = detector.best_mention(message.get("content", ""))
+        if current_course:
+            return current_course
     
-    return current_course
+    return None
 
-def check_if_asking_about_specific_course(user_message, chat_history):
+def check_if_asking_about_specific_course(user_message, chat_history, courses=None):
     """Check if user is asking about a specific course mentioned in recent conversation"""
     if not user_message:
         return None
     
+    if courses is None:
+        courses = load_courses()
     message_lower = user_message.lower()
     
     # First check if they're asking about a specific course in this message
-    if "animation" in message_lower and ("b.des" in message_lower or "visual effects" in message_lower):
-        return "B.Des in Animation and Visual Effects"
+    mentioned_course = get_mention_detector(courses).best_mention(user_message)
+    if mentioned_course:
+        return mentioned_course
     
     # If not, check what course is currently being discussed
-    current_course = extract_current_discussion_course(chat_history)
+    current_course = extract_current_discussion_course(chat_history, courses)
     
     # If asking follow-up questions about career/jobs/details, assume it's about current course
-    followup_keywords = [
-        "job opportunities", "career prospects", "employment", "salary", "placement",
-        "subjects", "curriculum", "syllabus", "details", "more about", "tell me about",
-        "how is", "what about", "opportunities", "scope", "future"
-    ]
-    
-    if any(keyword in message_lower for keyword in followup_keywords) and current_course:
+    if FOLLOWUP_PATTERN.search(message_lower) and current_course:
         return current_course
     
     return None
@@ -86,23 +139,21 @@ def check_if_asking_for_alternatives(user_message):
     if not user_message:
         return False
     
-    message_lower = user_message.lower()
-    
-    # Keywords that indicate they want different options
-    alternative_keywords = [
-        "other options", "different courses", "alternatives", "other courses",
-        "something else", "different options", "more options", "other programs",
-        "different field", "change", "instead", "rather than", "not interested",
-        "don't like", "different area", "explore other", "what else",
-        "any other", "show me other", "different degree", "other majors"
-    ]
-    
-    # Check if any alternative keywords are present
-    for keyword in alternative_keywords:
-        if keyword in message_lower:
-            return True
-    
-    return False
+    # One pass over the message for all alternative-request keywords
+    return ALTERNATIVES_PATTERN.search(user_message.lower()) is not None
+
+# Course keywords that fit each kind of activity
+ACTIVITY_COURSE_MAPPING = {
+    "leadership": ["management", "business", "administration", "leadership"],
+    "technical projects": ["computer", "technology", "engineering", "software"],
+    "creative arts": ["design", "art", "creative", "visual", "communication"],
+    "sports": ["sports", "physical education", "athletics", "fitness"],
+    "community service": ["social work", "psychology", "counseling", "humanities"],
+    "academic excellence": ["research", "science", "mathematics", "academic"],
+    "performance": ["music", "performing arts", "media", "communication"],
+    "business": ["business", "commerce", "management", "finance", "entrepreneurship"]
+}
+
 def filter_and_match_courses(courses, profile):
     """Filter courses by degree level and match to profile with MEDIUM weight for activities"""
     degree_level = profile.get("degree_level", "Bachelor's Degree")
@@ -145,20 +196,9 @@ def filter_and_match_courses(courses, profile):
                     break
             
             # Check activity matching - MEDIUM WEIGHTAGE
-            activity_course_mapping = {
-                "leadership": ["management", "business", "administration", "leadership"],
-                "technical projects": ["computer", "technology", "engineering", "software"],
-                "creative arts": ["design", "art", "creative", "visual", "communication"],
-                "sports": ["sports", "physical education", "athletics", "fitness"],
-                "community service": ["social work", "psychology", "counseling", "humanities"],
-                "academic excellence": ["research", "science", "mathematics", "academic"],
-                "performance": ["music", "performing arts", "media", "communication"],
-                "business": ["business", "commerce", "management", "finance", "entrepreneurship"]
-            }
-            
             for activity in activities:
                 activity_lower = activity.lower()
-                for activity_type, course_keywords in activity_course_mapping.items():
+                for activity_type, course_keywords in ACTIVITY_COURSE_MAPPING.items():
                     if activity_type in activity_lower:
                         if any(keyword in course_text for keyword in course_keywords):
                             activity_match = True
@@ -179,32 +219,139 @@ def filter_and_match_courses(courses, profile):
     
     return filtered_courses
 
-def prepare_initial_prompt(profile, courses):
-    """Prepare the initial recommendation prompt"""
-    profile_str = json.dumps(profile, indent=2)
+def format_course_facts(course):
+    """One line of structured facts scraped from the course page (empty if none)"""
+    facts = []
+    if course.get('duration'):
+        facts.append(f"Duration: {course['duration']}")
+    if course.get('fees'):
+        facts.append(f"Fees: {course['fees']}")
+    if course.get('eligibility'):
+        facts.append(f"Eligibility: {course['eligibility']}")
+    if course.get('specializations'):
+        facts.append(f"Specializations: {', '.join(course['specializations'])}")
+    return " | ".join(facts)
+
+def format_course_entry(course):
+    """Catalog entry for a course as shown in prompts"""
+    course_name = course.get('course', '')
+    degree_name = course.get('degree', '')
+    source_url = course.get('source_url', '')
+    subjects = course.get('subjects', [])
+    subjects_str = f" (Subjects: {', '.join(subjects)})" if subjects else ""
     
-    # Filter and match courses without bias
+    entry = f"- **{course_name}** from {degree_name}{subjects_str}\n"
+    facts = format_course_facts(course)
+    if facts:
+        entry += f"  {facts}\n"
+    entry += f"  URL: {source_url}\n\n"
+    return entry
+
+def format_course_details(course):
+    """Full structured facts for a single course, including the semester-wise syllabus"""
+    lines = []
+    facts = format_course_facts(course)
+    if facts:
+        lines.append(facts)
+    for semester, semester_subjects in course.get('syllabus', {}).items():
+        lines.append(f"{semester}: {', '.join(semester_subjects)}")
+    if course.get('source_url'):
+        lines.append(f"URL: {course['source_url']}")
+    return "\n".join(lines)
+
+def find_course(courses, course_name):
+    """Find a catalog course by exact or partial (case-insensitive) name"""
+    name_lower = course_name.lower()
+    for course in courses:
+        if course.get('course', '').lower() == name_lower:
+            return course
+    for course in courses:
+        title = course.get('course', '').lower()
+        if name_lower in title or title in name_lower:
+            return course
+    return None
+
+ADVISOR_ROLE = "You are an expert academic advisor at Jain University helping a student choose the right course."
+
+# Shared by every prompt and placed first, so all requests start with the same prefix
+STATIC_PREFIX = f"""{ADVISOR_ROLE}
+
+General rules:
+- Always address the student directly using "you" and "your"
+- Only recommend courses at the student's degree level - do not mix bachelor's and master's programs
+- Include the course URL whenever you recommend a specific program
+- Be supportive and encouraging, and keep the heading text size normal (not overly large)"""
+
+def serialize_profile(profile):
+    """Deterministic profile JSON (sorted keys) so identical profiles give identical prompts"""
+    return json.dumps(profile, indent=2, sort_keys=True, ensure_ascii=False)
+
+def build_course_catalog(courses, profile):
+    """Catalog text of the profile's matched courses, without duplicates or invalid entries"""
     relevant_courses = filter_and_match_courses(courses, profile)
-    degree_level = profile.get("degree_level", "Bachelor's Degree")
-    
-    # Create a cleaner course catalog with URLs
     course_catalog = ""
     seen_courses = set()
     
     for c in relevant_courses:
         course_name = c.get('course', '')
         degree_name = c.get('degree', '')
-        source_url = c.get('source_url', '')
         
         # Skip duplicates and invalid entries
         if (course_name, degree_name) in seen_courses or len(course_name.split()) < 3:
             continue
             
         seen_courses.add((course_name, degree_name))
-        subjects = c.get('subjects', [])
-        subjects_str = f" (Subjects: {', '.join(subjects)})" if subjects else ""
-        
-        course_catalog += f"- **{course_name}** from {degree_name}{subjects_str}\n  URL: {source_url}\n\n"
+        course_catalog += format_course_entry(c)
+    
+    return course_catalog
+
+def ranked_courses(courses, profile, limit):
+    """Top matched courses, with the same duplicate and validity rules as the prompt catalog"""
+    ranked = []
+    seen = set()
+    for course in filter_and_match_courses(courses, profile):
+        name = course.get("course", "")
+        if (name, course.get("degree", "")) in seen or len(name.split()) < 3:
+            continue
+        seen.add((name, course.get("degree", "")))
+        ranked.append(course)
+        if len(ranked) == limit:
+            break
+    return ranked
+
+def matched_signals(course, profile):
+    """(interests, activities) from the profile that a course matches on"""
+    course_text = (course.get("course", "") + " " + course.get("degree", "")).lower()
+    interests = [interest for interest in profile.get("interests", [])
+                 if interest.lower() in course_text or any(word in course_text for word in interest.lower().split())]
+    activities = [activity for activity in profile.get("activities", [])
+                  if any(activity_type in activity.lower() and any(keyword in course_text for keyword in keywords)
+                         for activity_type, keywords in ACTIVITY_COURSE_MAPPING.items())]
+    return interests, activities
+
+def assemble_prompt(profile=None, catalog="", degree_level="", context="", task="", question=""):
+    """Canonical prompt layout: static prefix, catalog, profile, then turn-specific parts.
+    
+    The most stable sections come first so provider-side or local prefix
+    caching can reuse them across requests.
+    """
+    sections = [STATIC_PREFIX]
+    if catalog:
+        sections.append(f"Available {degree_level} Courses:\n{catalog.rstrip()}")
+    if profile is not None:
+        sections.append(f"Student Profile:\n{serialize_profile(profile)}")
+    if context:
+        sections.append(context.strip())
+    if task:
+        sections.append(task.strip())
+    if question:
+        sections.append(f"Student's current question: {question}")
+    return "\n\n".join(sections) + "\n"
+
+@traced("prepare_initial_prompt")
+def prepare_initial_prompt(profile, courses):
+    """Prepare the initial recommendation prompt"""
+    degree_level = profile.get("degree_level", "Bachelor's Degree")
 
     # Check if profile needs clarification
     needs_clarification = profile.get("needs_clarification", False)
@@ -212,13 +359,7 @@ def prepare_initial_prompt(profile, courses):
     completeness_score = profile.get("completeness_score", 100)
 
     if needs_clarification and clarifying_questions:
-        prompt = f"""
-You are an expert academic advisor helping students choose the right university course.
-
-Here is the student's current profile:
-{profile_str}
-
-IMPORTANT: The student's profile is only {completeness_score}% complete. Before giving course recommendations, you need to gather more information.
+        task = f"""IMPORTANT: The student's profile is only {completeness_score}% complete. Before giving course recommendations, you need to gather more information.
 
 Your task:
 1. Acknowledge what information you have about the student
@@ -228,19 +369,13 @@ Your task:
 
 4. Be encouraging and explain that this will help you suggest the best-fit courses
 
-Keep your response friendly and conversational. Don't recommend specific courses yet - focus on gathering more information first.
-"""
-    else:
-        prompt = f"""
-You are an expert academic advisor helping students choose the right university course.
-
-Here is the student's profile:
-{profile_str}
-
-Here are the available {degree_level} courses:
-{course_catalog}
+Keep your response friendly and conversational. Don't recommend specific courses yet - focus on gathering more information first."""
+        return assemble_prompt(profile=profile, task=task)
 
-Your task:
+    # Filter and match courses without bias
+    course_catalog = build_course_catalog(courses, profile)
+    
+    task = f"""Your task:
 1. Analyze the student's strengths (top academic subjects), interests, AND extracurricular activities
 2. Give MEDIUM WEIGHT to their activities and derived skills when making recommendations
 3. Suggest 3-4 best-fit {degree_level} courses that align with their complete profile
@@ -255,160 +390,320 @@ IMPORTANT:
 - If they have creative activities, emphasize design/arts alignment
 - If they have sports activities, consider sports science/physical education
 - Only recommend {degree_level} courses - do not mix bachelor's and master's programs
-- Always address the student directly using "you" and "your" throughout your response
-- Keep the heading text size normal (not overly large)
 
 Format your response in a friendly, supportive tone. Structure it with clear headings and include the URLs so students can learn more about each course.
 
 End by asking: "Would you like me to explain more about any of these courses, or would you prefer to explore other options?"
 """
 
-    return prompt
+    return assemble_prompt(profile=profile, catalog=course_catalog, degree_level=degree_level, task=task)
 
-def prepare_context_prompt(profile, courses, chat_history):
+@traced("prepare_context_prompt")
+def prepare_context_prompt(profile, courses, chat_history, state=None):
     """Prepare prompt with full chat context - focused on initial recommendations"""
-    profile_str = json.dumps(profile, indent=2)
+    # Bring the conversation state up to date with the new messages only
+    if state is None:
+        state = ConversationState(courses)
+    state.update(chat_history)
     
-    # Get the initial recommended courses from the first assistant message
-    initial_courses = extract_initial_recommended_courses(chat_history)
+    parts = prepare_turn_instructions(profile, courses, state)
+    return assemble_prompt(profile=profile, **parts)
+
+def prepare_turn_instructions(profile, courses, state):
+    """Turn-specific prompt parts (catalog, context, task, question) for the latest user message"""
     degree_level = profile.get("degree_level", "Bachelor's Degree")
     
-    # Build conversation history - only include the last few relevant messages
-    recent_messages = chat_history[-6:] if len(chat_history) > 6 else chat_history
-    conversation_context = ""
+    # Only the student's latest question is included, not the assistant responses, to avoid echoing
+    latest_user_message = state.latest_user_message
+    parts = {"degree_level": degree_level, "question": latest_user_message}
     
-    # Only include user messages for context, not the assistant responses to avoid echoing
-    user_messages = [msg for msg in recent_messages if msg.get("role") == "user"]
-    if user_messages:
-        latest_user_message = user_messages[-1].get("content", "")
-        conversation_context = f"Student's current question: {latest_user_message}"
-    
-    # Check if student is asking for different/alternative courses
-    asking_for_alternatives = check_if_asking_for_alternatives(latest_user_message if user_messages else "")
-    
-    # Check if student is asking about a specific course
-    specific_course = check_if_asking_about_specific_course(latest_user_message if user_messages else "", chat_history)
+    # Check if student is asking for different/alternative courses or about a specific course
+    asking_for_alternatives = state.intent == "alternatives"
+    specific_course = state.specific_course
+
+    if GENERATION_PROFILES.get(state.intent, GENERATION_PROFILES["followup"])["include_catalog"]:
+        parts["catalog"] = build_course_catalog(courses, profile)
 
     if asking_for_alternatives:
         # Only then provide new course options
-        relevant_courses = filter_and_match_courses(courses, profile)
-        course_catalog = ""
-        seen_courses = set()
-        
-        for c in relevant_courses:
-            course_name = c.get('course', '')
-            degree_name = c.get('degree', '')
-            source_url = c.get('source_url', '')
-            
-            if (course_name, degree_name) in seen_courses or len(course_name.split()) < 3:
-                continue
-                
-            seen_courses.add((course_name, degree_name))
-            subjects = c.get('subjects', [])
-            subjects_str = f" (Subjects: {', '.join(subjects)})" if subjects else ""
-            
-            course_catalog += f"- **{course_name}** from {degree_name}{subjects_str}\n  URL: {source_url}\n\n"
-
-        prompt = f"""
-You are an expert academic advisor at Jain University helping a student choose the right course.
-
-Student Profile:
-{profile_str}
-
-The student is asking for different/alternative course options from what was initially suggested.
-
-Available {degree_level} Courses:
-{course_catalog}
-
-{conversation_context}
-
-Instructions:
+        parts["context"] = "The student is asking for different/alternative course options from what was initially suggested."
+        parts["task"] = f"""Instructions:
 - The student wants to explore different options, so you can suggest new courses
 - Only recommend {degree_level} courses
 - Provide helpful, specific advice about these alternative courses
-- Include course URLs when recommending specific programs
-- Be supportive and encouraging
-- IMPORTANT: Always address the student directly using "you" and "your"
 - Format recommendations clearly with explanations
 
-Respond naturally as their personal academic advisor offering alternative options.
-"""
+Respond naturally as their personal academic advisor offering alternative options."""
     elif specific_course:
         # Student is asking about a specific course - focus only on that course
-        prompt = f"""
-You are an expert academic advisor at Jain University helping a student choose the right course.
-
-Student Profile:
-{profile_str}
-
-IMPORTANT: The student is currently asking about **{specific_course}** specifically. 
-
-{conversation_context}
-
-Instructions:
+        catalog_course = find_course(courses, specific_course)
+        course_details = format_course_details(catalog_course) if catalog_course else ""
+        context = f"IMPORTANT: The student is currently asking about **{specific_course}** specifically."
+        if course_details:
+            context += f"\n\nKnown facts about {specific_course} (from the university website - prefer these over assumptions):\n{course_details}"
+        
+        # Ground the answer in the most relevant excerpts of the scraped course page
+        if catalog_course:
+            excerpts = retrieve_course_context(f"{specific_course} {latest_user_message}", catalog_course)
+            if excerpts:
+                context += f"\n\nRelevant excerpts from the {specific_course} page:\n{excerpts}"
+        
+        parts["context"] = context
+        parts["task"] = f"""Instructions:
 - Answer ONLY about {specific_course} - do NOT mention other courses
 - If they ask about job opportunities, career prospects, subjects, etc. - relate everything to {specific_course}
 - Provide detailed, helpful information specifically about {specific_course}
 - Do NOT suggest other courses or alternatives unless they specifically ask
 - Be informative and enthusiastic about {specific_course}
-- IMPORTANT: Always address the student directly using "you" and "your"
 - Keep your response focused entirely on {specific_course}
+- Base your answer on the facts and excerpts above when they cover the question, and keep it concise
 
-Your goal is to provide comprehensive information about {specific_course} that the student is asking about.
-
-Respond naturally as their personal academic advisor, focusing exclusively on {specific_course}.
-"""
+Respond naturally as their personal academic advisor, focusing exclusively on {specific_course}."""
     else:
         # Focus on initially recommended courses only
-        prompt = f"""
-You are an expert academic advisor at Jain University helping a student choose the right course.
-
-Student Profile:
-{profile_str}
-
-IMPORTANT CONTEXT: You have already suggested specific courses to this student in your initial recommendation. Here are the courses you initially recommended:
-{initial_courses}
-
-{conversation_context}
-
-Instructions:
+        parts["context"] = f"""IMPORTANT CONTEXT: You have already suggested specific courses to this student in your initial recommendation. Here are the courses you initially recommended:
+{state.initial_courses_summary()}"""
+        parts["task"] = """Instructions:
 - FOCUS ONLY on the courses you initially recommended - do NOT suggest new courses
 - Answer the student's question in the context of those initially recommended courses
 - If they ask about career prospects, job opportunities, curriculum, etc. - relate it to the initially suggested courses
 - If they ask general questions, tie your answers back to how the initially recommended courses address their needs
 - Do NOT offer alternative courses or new suggestions unless they specifically ask for different options
-- Be helpful and informative about the courses you already suggested
-- IMPORTANT: Always address the student directly using "you" and "your"
 - Keep your response focused and conversational
 
-Your goal is to help the student understand and feel confident about the courses you initially recommended, not to overwhelm them with more options.
+Your goal is to help the student understand and feel confident about the courses you initially recommended, not to overwhelm them with more options."""
 
-Respond naturally as their personal academic advisor, staying focused on the initially suggested courses.
-"""
+    return parts
 
-    return prompt
+def prepare_system_prompt(profile):
+    """System prompt for the message-list mode: static prefix and the profile, sent once per request"""
+    return assemble_prompt(profile=profile).rstrip()
 
-def get_recommendation_with_context(profile, courses, chat_history):
-    """Get recommendation with full chat context"""
+@traced("prepare_context_messages")
+def prepare_context_messages(profile, courses, chat_history, state=None, memory=None):
+    """Message list with a rolling window of real turns instead of a single rebuilt prompt"""
+    if state is None:
+        state = ConversationState(courses)
+    state.update(chat_history)
+    if memory is None:
+        memory = ChatMemory(summarize_fn=summarize_turns)
+    
+    # The turn message reuses the canonical layout minus the prefix and profile already in the system prompt
+    turn_prompt = assemble_prompt(**prepare_turn_instructions(profile, courses, state))
+    turn_prompt = turn_prompt[len(STATIC_PREFIX):].strip()
+    
+    return memory.build_messages(prepare_system_prompt(profile), chat_history, turn_prompt)
+
+# Generation settings per turn type; trivial turns ("thanks") never reach the LLM
+GENERATION_PROFILES = {
+    "initial": {"model": os.getenv("MISTRAL_MODEL", "mistral-tiny"), "max_tokens": 800, "temperature": 0.7, "include_catalog": True},
+    "alternatives": {"model": os.getenv("MISTRAL_MODEL", "mistral-tiny"), "max_tokens": 800, "temperature": 0.7, "include_catalog": True},
+    "specific_course": {"model": os.getenv("MISTRAL_MODEL", "mistral-tiny"), "max_tokens": 500, "temperature": 0.5, "include_catalog": False},
+    "followup": {"model": os.getenv("MISTRAL_FAST_MODEL", "mistral-tiny"), "max_tokens": 350, "temperature": 0.5, "include_catalog": False}
+}
+
+SMALLTALK_REPLIES = {
+    "thanks": "You're welcome! 😊",
+    "greeting": "Hi there! 👋",
+    "goodbye": "Good luck with your decision - I'm here whenever you want to continue exploring your options! 🎓",
+    "acknowledgement": "Great!"
+}
+
+def local_smalltalk_reply(state):
+    """Instant reply to small talk, pointing back to the course being discussed"""
+    reply = SMALLTALK_REPLIES.get(state.smalltalk, "Great!")
+    if state.smalltalk == "goodbye":
+        return reply
+    course = state.recent_course()
+    if course:
+        return f"{reply} Would you like to know more about **{course}** - like the syllabus, fees or career options - or would you prefer to explore other courses?"
+    return f"{reply} Is there anything else you'd like to know about the courses I suggested, or would you like to explore other options?"
+
+RESPONSE_CACHE_SIZE = 256
+_response_cache = OrderedDict()
+# Shared by the deadline, prefetch and Streamlit threads
+_response_cache_lock = threading.Lock()
+
+def prompt_cache_key(messages, model, max_tokens):
+    """Reproducible cache key for a request"""
+    payload = json.dumps({"model": model, "max_tokens": max_tokens, "messages": messages},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def summarize_turns(previous_summary, messages):
+    """Summarize older chat turns with a short LLM call"""
+    transcript = "\n".join(
+        f"{'Student' if m.get('role') == 'user' else 'Advisor'}: {m.get('content', '')}" for m in messages
+    )
+    previous = f"Summary so far:\n{previous_summary}\n\n" if previous_summary else ""
+    response = get_openai().ChatCompletion.create(
+        model="mistral-tiny",
+        messages=[{"role": "user", "content": f"""{previous}Summarize this part of a conversation between a student and an academic advisor in at most 5 short bullet points. Keep course names, the student's stated preferences and any decisions.
+
+{transcript}"""}],
+        temperature=0.2,
+        max_tokens=150
+    )
+    return response["choices"][0]["message"]["content"]
+
+@traced("get_recommendation_with_context")
+def get_recommendation_with_context(profile, courses, chat_history, state=None, memory=None):
+    """Get recommendation with full chat context.
+    
+    With a ChatMemory, follow-ups are sent as a message list (profile once in
+    the system prompt, recent turns verbatim, older turns summarized).
+    """
+    if profile.get("needs_clarification"):
+        # Clarifying questions are asked locally; the LLM is called once the profile is complete
+        if chat_history and chat_history[-1].get("role") == "user":
+            apply_clarification_answer(profile, chat_history[-1].get("content", ""))
+        if clarification_pending(profile):
+            set_attributes(local_clarification=True)
+            return render_clarification(profile)
+        profile["needs_clarification"] = False
+        chat_history = []
+    
     if not chat_history:
+        # Common archetypes are served from the precomputed table
+        precomputed = lookup_initial_recommendation(profile, courses)
+        if precomputed is not None:
+            set_attributes(archetype_hit=True)
+            return precomputed
         # Initial recommendation
-        prompt = prepare_initial_prompt(profile, courses)
+        generation = GENERATION_PROFILES["initial"]
+        messages = [{"role": "user", "content": prepare_initial_prompt(profile, courses)}]
     else:
-        # Contextual response
-        prompt = prepare_context_prompt(profile, courses, chat_history)
+        # Route the turn by intent: small talk is answered locally, the rest get sized settings
+        if state is None:
+            state = ConversationState(courses)
+        state.update(chat_history)
+        set_attributes(intent=state.intent)
+        if state.intent == "smalltalk":
+            return local_smalltalk_reply(state)
+        generation = GENERATION_PROFILES.get(state.intent, GENERATION_PROFILES["followup"])
+        
+        if memory is not None:
+            # Multi-turn message history
+            messages = prepare_context_messages(profile, courses, chat_history, state, memory)
+        else:
+            # Contextual response
+            messages = [{"role": "user", "content": prepare_context_prompt(profile, courses, chat_history, state)}]
+    
+    model, max_tokens = generation["model"], generation["max_tokens"]
+    
+    # Identical requests (same canonical prompt) are answered from the cache
+    cache_key = prompt_cache_key(messages, model, max_tokens)
+    with _response_cache_lock:
+        if cache_key in _response_cache:
+            _response_cache.move_to_end(cache_key)
+            return _response_cache[cache_key]
     
     try:
-        response = openai.ChatCompletion.create(
-            model="mistral-tiny",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=800
-        )
+        with span("llm.chat_completion", model=model, max_tokens=max_tokens):
+            response = get_openai().ChatCompletion.create(
+                model=model,
+                messages=messages,
+                temperature=generation["temperature"],
+                max_tokens=max_tokens
+            )
+            usage = response.get("usage") or {}
+            set_attributes(prompt_tokens=usage.get("prompt_tokens", 0),
+                           completion_tokens=usage.get("completion_tokens", 0))
         
-        return response["choices"][0]["message"]["content"]
+        content = response["choices"][0]["message"]["content"]
+        with _response_cache_lock:
+            _response_cache[cache_key] = content
+            if len(_response_cache) > RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+        return content
     
     except Exception as e:
-        return f"I apologize, but I'm having trouble connecting to generate recommendations right now. Error: {str(e)}. Please try again in a moment."
+        logger.warning("Recommendation request failed: %s", type(e).__name__)
+        return f"{ERROR_RESPONSE_PREFIX} to generate recommendations right now. Error: {str(e)}. Please try again in a moment."
+
+ERROR_RESPONSE_PREFIX = "I apologize, but I'm having trouble connecting"
+
+def is_error_response(response):
+    return response.startswith(ERROR_RESPONSE_PREFIX)
+
+PENDING_NOTE = "_I'm still putting together a more detailed, personalised answer - it will replace this one in a moment._"
+UNAVAILABLE_NOTE = "_I couldn't reach the advisor model just now, so this comes straight from the course catalog. Ask again in a moment for a detailed explanation._"
+
+def expire_pending_note(response):
+    """A fallback whose LLM answer never arrived, reworded so it no longer promises one"""
+    return response.replace(PENDING_NOTE, UNAVAILABLE_NOTE)
+
+def fallback_recommendation(profile, courses, state=None, pending=True, limit=4):
+    """Deterministic answer from the course matcher for when the LLM is slow or down"""
+    note = PENDING_NOTE if pending else UNAVAILABLE_NOTE
+    
+    # Follow-ups about one course get that course's scraped facts
+    if state is not None and state.intent == "specific_course" and state.specific_course:
+        course = find_course(courses, state.specific_course)
+        if course:
+            return f"Here's what I know about **{course.get('course', '')}** from the university website:\n\n{format_course_details(course)}\n\n{note}"
+    
+    degree_level = profile.get("degree_level", "Bachelor's Degree")
+    lines = [f"Here are the {degree_level} courses that best match your profile:\n"]
+    for i, course in enumerate(ranked_courses(courses, profile, limit), 1):
+        interests, activities = matched_signals(course, profile)
+        lines.append(f"**{i}. {course.get('course', '')}**")
+        reasons = []
+        if interests:
+            reasons.append(f"matches your interest in {', '.join(interests)}")
+        if activities:
+            reasons.append(f"builds on your {', '.join(activities)} experience")
+        if reasons:
+            lines.append(f"- Why: it {' and '.join(reasons)}")
+        facts = format_course_facts(course)
+        if facts:
+            lines.append(f"- {facts}")
+        lines.append(f"- URL: {course.get('source_url', '')}\n")
+    lines.append(note)
+    return "\n".join(lines)
+
+_deadline_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-deadline")
+
+def get_recommendation_with_deadline(profile, courses, chat_history, state=None, memory=None, deadline_ms=None):
+    """(response, pending future) with time-to-answer bounded by deadline_ms.
+    
+    If the LLM hasn't answered by the deadline, a deterministic fallback is
+    returned together with a future for the LLM answer, which the caller can
+    swap in once it arrives. Failed LLM calls also get the fallback.
+    """
+    if state is None:
+        state = ConversationState(courses)
+    if chat_history:
+        # Updated here so the fallback can read the intent without racing the worker
+        state.update(chat_history)
+    if memory is not None:
+        # Fold here too, so the worker's copy has nothing left to fold
+        memory.window(prior_turns(chat_history))
+    
+    # The worker may outlive the deadline while the caller appends to and compacts
+    # the live history, so it gets its own copies of the history, state and memory
+    worker_memory = memory.copy() if memory is not None else None
+    # Run in a copy of the current context so tracing spans nest under the caller's
+    context = contextvars.copy_context()
+    future = _deadline_pool.submit(context.run, get_recommendation_with_context,
+                                   profile, courses, list(chat_history), state.copy(), worker_memory)
+    try:
+        response = future.result(timeout=deadline_ms / 1000.0 if deadline_ms else None)
+    except FutureTimeoutError:
+        set_attributes(deadline_fallback=True)
+        return fallback_recommendation(profile, courses, state if chat_history else None), future
+    
+    if is_error_response(response):
+        return fallback_recommendation(profile, courses, state if chat_history else None, pending=False), None
+    return response, None
+
+def resolve_pending(future, timeout=None):
+    """The late LLM answer, or None if it failed or is still not ready"""
+    try:
+        response = future.result(timeout=timeout)
+    except Exception:
+        return None
+    return None if is_error_response(response) else response
 
 def get_recommendation(profile, courses):
     """Legacy function for backward compatibility"""
@@ -0,0 +1,128 @@
+# course_mentions.py - Catalog-driven detection of course mentions in chat messages
+import re
+from collections import Counter
+from functools import lru_cache
+
+from near_duplicates import ABBREVIATIONS, NOISE_WORDS, normalize_title
+from profile_builder import INTEREST_MAPPING
+
+# Words that appear in titles but don't identify a course
+GENERIC_WORDS = {
+    "course", "courses", "program", "programs", "programme", "top", "best", "india", "ju",
+    "deemed", "to", "be", "at", "for", "certified", "bachelor", "master", "ba", "ma"
+}
+
+# Plain subject words ("science", "design", "art") say what a student likes, not which course they mean
+SUBJECT_WORDS = {word for keywords in INTEREST_MAPPING.values() for keyword in keywords for word in keyword.split()}
+
+def _words(text):
+    return normalize_title(text).split()
+
+def _subject_words(segment):
+    """The segment without degree abbreviations and generic words: "BSc in Sports Sciences" -> sports sciences"""
+    tokens = [token.replace(".", "") for token in re.findall(r"[a-z0-9.&]+", segment.lower())]
+    return [token for token in tokens
+            if token and token not in ABBREVIATIONS and token not in NOISE_WORDS and token not in GENERIC_WORDS]
+
+def course_aliases(course):
+    """Phrases (as word tuples) that refer to a course.
+
+    Only multi-word phrases are indexed, so a message naming a subject
+    ("I love design") isn't taken as a question about one course.
+    """
+    titles = [course.get("course", "")] + list(course.get("aliases", []))
+    phrases = set()
+    for title in titles:
+        # "Graphic Design Courses in Bangalore | BA Comm Design" -> both halves
+        for segment in [title] + re.split(r"[|:]| - ", title):
+            words = _words(segment)
+            core = [word for word in words if word not in GENERIC_WORDS]
+            for phrase in (words, core, _subject_words(segment)):
+                if len(phrase) >= 2:
+                    phrases.add(tuple(phrase))
+    return phrases
+
+def title_acronyms(course):
+    """Uppercase acronyms in a title ("VFX", "CA") that aren't degree names or subject words"""
+    acronyms = set()
+    for token in re.findall(r"[A-Za-z]+", course.get("course", "")):
+        word = token.lower()
+        if (len(token) >= 2 and token.isupper() and word not in ABBREVIATIONS
+                and word not in GENERIC_WORDS and word not in NOISE_WORDS and word not in SUBJECT_WORDS):
+            acronyms.add(word)
+    return acronyms
+
+class MentionDetector:
+    """Word-level trie over course names, abbreviations and aliases"""
+
+    def __init__(self, courses):
+        self.trie = {}
+        titled = [course for course in courses if course.get("course")]
+
+        # An acronym that appears in exactly one title ("vfx") is an alias for that course
+        acronym_owners = Counter(word for course in titled for word in title_acronyms(course))
+
+        for course in titled:
+            title = course["course"]
+            for phrase in course_aliases(course):
+                self._insert(phrase, title)
+            for word in title_acronyms(course):
+                if acronym_owners[word] == 1:
+                    self._insert((word,), title)
+
+        self.mentions_in_message = lru_cache(maxsize=1024)(self._mentions_in_message)
+
+    def _insert(self, phrase, title):
+        node = self.trie
+        for word in phrase:
+            node = node.setdefault(word, {})
+        # First course wins when two courses share a phrase
+        node.setdefault(None, (title, len(phrase)))
+
+    def _mentions_in_message(self, content):
+        """(course, matched phrase length) for each course mentioned, in order of appearance"""
+        words = _words(content)
+        found = {}
+        position = 0
+        while position < len(words):
+            node = self.trie
+            best = None
+            for offset in range(position, len(words)):
+                node = node.get(words[offset])
+                if node is None:
+                    break
+                if None in node:
+                    best = node[None]
+            if best:
+                title, length = best
+                found[title] = max(found.get(title, 0), length)
+                position += length
+            else:
+                position += 1
+        return tuple(found.items())
+
+    def mentions(self, content):
+        """Courses mentioned in a message, in order of appearance"""
+        return [title for title, _ in self.mentions_in_message(content)]
+
+    def best_mention(self, content):
+        """The most specific course mentioned in a message (longest matched phrase), or None"""
+        mentions = self.mentions_in_message(content)
+        if not mentions:
+            return None
+        return max(mentions, key=lambda mention: mention[1])[0]
+
+_detectors = {}
+
+def get_mention_detector(courses):
+    """Detector for a catalog list, built once per loaded catalog"""
+    cached = _detectors.get(id(courses))
+    if cached and cached[0] is courses:
+        return cached[1]
+
+    detector = MentionDetector(courses)
+    if len(_detectors) >= 16:
+        _detectors.pop(next(iter(_detectors)))
+    # Keep a reference to the list so its id can't be reused while cached
+    _detectors[id(courses)] = (courses, detector)
+    return detector
@@ -0,0 +1,137 @@
+# course_retrieval.py - Local chunk store and BM25 index over scraped course pages
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+CHUNKS_PATH = "course_chunks.jsonl"
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "with", "will", "you", "your",
+    "what", "how", "about", "me", "tell", "can", "i", "do", "does"
+}
+
+def tokenize(text):
+    return [token for token in re.findall(r"[a-z0-9]+", text.lower()) if token not in STOPWORDS]
+
+def chunk_text(text, size=120, overlap=30):
+    """Split text into overlapping chunks of about size words"""
+    words = text.split()
+    if not words:
+        return []
+    step = max(size - overlap, 1)
+    return [" ".join(words[start:start + size]) for start in range(0, max(len(words) - overlap, 1), step)]
+
+class ChunkWriter:
+    """Append course page text to the chunk store while crawling"""
+
+    def __init__(self, path=CHUNKS_PATH, resume=False):
+        self.path = path
+        self._file = open(path, "a" if resume else "w", encoding="utf-8", buffering=1)
+
+    def add_page(self, course, page_text):
+        for position, chunk in enumerate(chunk_text(page_text)):
+            self._file.write(json.dumps({
+                "course": course.get("course", ""),
+                "source_url": course.get("source_url", ""),
+                "chunk": position,
+                "text": chunk
+            }, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+class BM25Index:
+    """Okapi BM25 over chunks with an inverted index"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = []
+
+        for doc_id, chunk in enumerate(chunks):
+            term_counts = Counter(tokenize(chunk["course"] + " " + chunk["text"]))
+            self.doc_lengths.append(sum(term_counts.values()))
+            for term, count in term_counts.items():
+                self.postings.setdefault(term, []).append((doc_id, count))
+
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, k=3, source_url=None, source_urls=None):
+        """Top-k chunks for the query, optionally restricted to one course's page(s)"""
+        if source_url:
+            source_urls = {source_url} | set(source_urls or ())
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, count in self.postings[term]:
+                if source_urls and self.chunks[doc_id]["source_url"] not in source_urls:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * count * (self.k1 + 1) / (count + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [self.chunks[doc_id] for doc_id, _ in ranked]
+
+def load_chunks(path=CHUNKS_PATH):
+    """Read the chunk store, dropping chunks repeated by a resumed crawl"""
+    chunks = []
+    seen = set()
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return chunks
+    with f:
+        for line in f:
+            try:
+                chunk = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            key = (chunk["source_url"], chunk["chunk"])
+            if key not in seen:
+                seen.add(key)
+                chunks.append(chunk)
+    return chunks
+
+@lru_cache(maxsize=4)
+def _load_index(path, mtime):
+    return BM25Index(load_chunks(path))
+
+def get_index(path=CHUNKS_PATH):
+    """Process-wide BM25 index, rebuilt only when the chunk store changes"""
+    if not os.path.exists(path):
+        return None
+    return _load_index(path, os.path.getmtime(path))
+
+def retrieve_course_context(query, course=None, k=3, path=CHUNKS_PATH):
+    """Relevant page excerpts for a question, formatted for a prompt (empty if none).
+
+    With a catalog course, only that course's own pages (including URLs merged
+    into it as near-duplicates) are searched; excerpts from other courses'
+    pages would be passed off as facts about this one.
+    """
+    index = get_index(path)
+    if index is None:
+        return ""
+
+    if course:
+        source_urls = {url for url in [course.get("source_url")] + list(course.get("alternate_urls", [])) if url}
+        if not source_urls:
+            return ""
+        results = index.search(query, k=k, source_urls=source_urls)
+    else:
+        results = index.search(query, k=k)
+
+    return "\n\n".join(f"[{chunk['course']}] {chunk['text']}" for chunk in results)
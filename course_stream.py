@@ -0,0 +1,130 @@
+# course_stream.py - Streaming JSONL output for scraped courses
+import hashlib
+import json
+import os
+
+from catalog import CATALOG_DIR, shard_name_for_url, shard_path, update_index
+from near_duplicates import course_origin, find_near_duplicate_clusters, merge_cluster, report_clusters
+
+STREAM_PATH = "courses.jsonl"
+
+def course_key(course):
+    """Compact dedup key: 8-byte digest of the course's institution and normalized title.
+
+    Two institutions can offer a course with the same title; only repeats
+    within one institution are duplicates.
+    """
+    title = ' '.join(course.get('course', '').lower().split())
+    key = f"{course_origin(course)}\n{title}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+
+def iter_courses_jsonl(path=STREAM_PATH):
+    """Yield courses from a JSONL stream, skipping a torn last line"""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+class StreamingCourseWriter:
+    """Append each course to a JSONL file as soon as it is scraped, deduplicating online"""
+
+    def __init__(self, path=STREAM_PATH, resume=False):
+        self.path = path
+        self.seen_keys = set()
+        self.count = 0
+        if resume:
+            for course in iter_courses_jsonl(path):
+                self.seen_keys.add(course_key(course))
+                self.count += 1
+        # Line buffered so partial results are readable during the crawl
+        self._file = open(path, "a" if resume else "w", encoding="utf-8", buffering=1)
+
+    def add(self, course):
+        """Write a course unless an equal title from the same institution was already written"""
+        key = course_key(course)
+        if key in self.seen_keys:
+            return False
+        self.seen_keys.add(key)
+        self._file.write(json.dumps(course, ensure_ascii=False) + "\n")
+        self.count += 1
+        return True
+
+    def close(self):
+        self._file.close()
+
+class _JsonArrayWriter:
+    """Write a pretty-printed JSON array one element at a time"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.count = 0
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+        self._file.write("[")
+
+    def write(self, item):
+        self._file.write(",\n  " if self.count else "\n  ")
+        self._file.write(json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+        self.count += 1
+
+    def close(self):
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+def find_stream_duplicates(stream_path=STREAM_PATH):
+    """Find near-duplicate clusters in the stream and build their merged courses.
+
+    Returns (replacements, skip): the merged course to write in place of each
+    cluster's first member, and the indices of the other members.
+    """
+    clusters = find_near_duplicate_clusters(iter_courses_jsonl(stream_path))
+    if not clusters:
+        return {}, set()
+
+    # Only cluster members are loaded, not the whole catalog
+    member_indices = {index for members in clusters for index in members}
+    members_by_index = {
+        index: course for index, course in enumerate(iter_courses_jsonl(stream_path))
+        if index in member_indices
+    }
+    report_clusters(clusters, members_by_index)
+
+    replacements = {}
+    skip = set()
+    for members in clusters:
+        replacements[members[0]] = merge_cluster([members_by_index[index] for index in members])
+        skip.update(members[1:])
+    return replacements, skip
+
+def compact_courses(stream_path=STREAM_PATH, json_path="courses.json", shard_dir=CATALOG_DIR,
+                    merge_near_duplicates=True):
+    """Compact the JSONL stream into courses.json and per-source shards"""
+    replacements, skip = find_stream_duplicates(stream_path) if merge_near_duplicates else ({}, set())
+
+    os.makedirs(shard_dir, exist_ok=True)
+    catalog_writer = _JsonArrayWriter(json_path)
+    shard_writers = {}
+
+    for index, course in enumerate(iter_courses_jsonl(stream_path)):
+        if index in skip:
+            continue
+        course = replacements.get(index, course)
+        catalog_writer.write(course)
+        shard_name = course.get('catalog_source') or shard_name_for_url(course.get('source_url', ''))
+        if shard_name not in shard_writers:
+            shard_writers[shard_name] = _JsonArrayWriter(shard_path(shard_name, shard_dir))
+        shard_writers[shard_name].write(course)
+
+    catalog_writer.close()
+    for writer in shard_writers.values():
+        writer.close()
+    update_index({name: writer.count for name, writer in shard_writers.items()}, shard_dir)
+
+    return catalog_writer.count, len(shard_writers)
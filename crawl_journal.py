@@ -0,0 +1,102 @@
+# crawl_journal.py - Append-only checkpoint journal for resumable crawls
+import json
+import os
+
+from crawler import normalize_url
+
+JOURNAL_PATH = "crawl_journal.jsonl"
+
+class CrawlJournal:
+    """Append-only JSONL journal of crawl progress.
+
+    Every processed page is recorded together with the links it added to the
+    frontier, so replaying the journal rebuilds the exact frontier. Periodic
+    snapshots of the frontier keep the replay short.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, resume=False, sync_every=10):
+        self.path = path
+        self.sync_every = sync_every
+        self._since_sync = 0
+        mode = "a" if resume else "w"
+        self._file = open(path, mode, encoding="utf-8")
+
+    def _append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._since_sync += 1
+        if self._since_sync >= self.sync_every:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._since_sync = 0
+
+    def record_page(self, source_url, link_info, children):
+        self._append({
+            "type": "page",
+            "source_url": source_url,
+            "url": link_info["url"],
+            "children": children
+        })
+
+    def record_snapshot(self, source_url, frontier):
+        self._append({
+            "type": "snapshot",
+            "source_url": source_url,
+            "pending": frontier.pending(),
+            "seen": sorted(frontier.seen),
+            "popped": frontier.popped
+        })
+        self.flush()
+
+    def record_source_done(self, source_url):
+        self._append({"type": "source_done", "source_url": source_url})
+        self.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+def load_journal(path=JOURNAL_PATH):
+    """Replay a journal into per-source crawl state.
+
+    Returns (done_sources, states) where states maps a source URL to a dict
+    with pending links, the seen-set and the number of pages popped. Courses
+    themselves are recovered from the course stream (see course_stream.py).
+    """
+    done_sources = set()
+    states = {}
+
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return done_sources, states
+
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a torn last line behind
+                continue
+
+            source_url = record.get("source_url")
+            state = states.setdefault(source_url, {"pending": {}, "seen": set(), "popped": 0})
+
+            if record["type"] == "snapshot":
+                state["pending"] = {normalize_url(link["url"]): link for link in record["pending"]}
+                state["seen"] = set(record["seen"])
+                state["popped"] = record["popped"]
+            elif record["type"] == "page":
+                state["pending"].pop(normalize_url(record["url"]), None)
+                state["seen"].add(normalize_url(record["url"]))
+                state["popped"] += 1
+                for child in record["children"]:
+                    child_key = normalize_url(child["url"])
+                    state["seen"].add(child_key)
+                    state["pending"][child_key] = child
+            elif record["type"] == "source_done":
+                done_sources.add(source_url)
+
+    return done_sources, states
@@ -0,0 +1,145 @@
+# crawler.py - Crawl frontier, URL normalization and sitemap seeding
+import heapq
+import xml.etree.ElementTree as ET
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+import requests
+
+from app_logging import get_logger
+
+logger = get_logger("crawler")
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Query parameters that never change page content (matched by exact name)
+TRACKING_PARAMS = {
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'fbclid', 'gclid', 'msclkid'
+}
+
+def normalize_url(url):
+    """Canonical form of a URL so the same page is only crawled once"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "https"
+    netloc = parsed.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+
+    path = parsed.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    query_items = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ]
+    query = urlencode(sorted(query_items))
+
+    return urlunparse((scheme, netloc, path, "", query, ""))
+
+def same_site(url, root_domain):
+    """Check if url is on root_domain or one of its subdomains (ports are ignored on both sides)"""
+    host = (urlparse(url).hostname or "").lower()
+    root_host = (urlparse("//" + root_domain).hostname or "").lower()
+    return bool(root_host) and (host == root_host or host.endswith("." + root_host))
+
+class CrawlFrontier:
+    """Priority queue of URLs to crawl, best-scoring links first"""
+
+    def __init__(self, max_depth=3, max_pages=200, max_queued=5000):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_queued = max_queued
+        self.seen = set()
+        self.popped = 0
+        self._heap = []
+        self._counter = 0
+
+    def push(self, url, text="", source_url="", depth=0, score=0):
+        """Queue a URL unless it was already seen or is beyond the limits"""
+        if depth > self.max_depth:
+            return False
+
+        url_key = normalize_url(url)
+        if url_key in self.seen:
+            return False
+        self.seen.add(url_key)
+
+        entry = (-score, depth, self._counter, url, text, source_url)
+        self._counter += 1
+        if len(self._heap) < self.max_queued:
+            heapq.heappush(self._heap, entry)
+        elif entry < max(self._heap):
+            # Keep memory bounded: drop the lowest-priority entry
+            self._heap.remove(max(self._heap))
+            heapq.heapify(self._heap)
+            heapq.heappush(self._heap, entry)
+        else:
+            return False
+        return True
+
+    def pop(self):
+        """Return the next link dict, or None when done or over budget"""
+        if not self._heap or self.popped >= self.max_pages:
+            return None
+        neg_score, depth, _, url, text, source_url = heapq.heappop(self._heap)
+        self.popped += 1
+        return {
+            'url': url,
+            'text': text,
+            'source_url': source_url,
+            'depth': depth,
+            'score': -neg_score
+        }
+
+    def restore(self, pending, seen, popped):
+        """Rebuild the frontier from a checkpoint"""
+        self.seen = set()
+        self._heap = []
+        for link in pending:
+            self.push(link['url'], link['text'], link['source_url'], link['depth'], link['score'])
+        self.seen.update(seen)
+        self.popped = popped
+
+    def pending(self):
+        """Queued link dicts in priority order (used for checkpoints)"""
+        return [
+            {'url': url, 'text': text, 'source_url': source_url, 'depth': depth, 'score': -neg_score}
+            for neg_score, depth, _, url, text, source_url in sorted(self._heap)
+        ]
+
+    def __len__(self):
+        return len(self._heap)
+
+def fetch_sitemap_urls(site_url, max_sitemaps=10, timeout=10):
+    """Collect page URLs from the site's sitemap.xml (following sitemap indexes)"""
+    parsed = urlparse(site_url)
+    to_fetch = [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+    fetched = set()
+    page_urls = []
+
+    while to_fetch and len(fetched) < max_sitemaps:
+        sitemap_url = to_fetch.pop(0)
+        if sitemap_url in fetched:
+            continue
+        fetched.add(sitemap_url)
+
+        try:
+            response = requests.get(sitemap_url, headers=HEADERS, timeout=timeout)
+            response.raise_for_status()
+            root = ET.fromstring(response.content)
+        except Exception as e:
+            logger.info("No usable sitemap at %s: %s", sitemap_url, e)
+            continue
+
+        for element in root.iter():
+            if not element.tag.endswith('loc') or not element.text:
+                continue
+            loc = element.text.strip()
+            if root.tag.endswith('sitemapindex'):
+                to_fetch.append(loc)
+            else:
+                page_urls.append(loc)
+
+    return page_urls
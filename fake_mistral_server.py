@@ -0,0 +1,128 @@
+# fake_mistral_server.py - Local Mistral/OpenAI-compatible stub for load testing
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "you your course program career skills design business commerce finance sports "
+    "students curriculum placement opportunities industry projects learning university"
+).split()
+
+class FakeMistralConfig:
+    def __init__(self, latency_ms=300, tokens_per_second=50.0, error_rate=0.0,
+                 completion_tokens=200, seed=None):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.completion_tokens = completion_tokens
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+def make_handler(config):
+    class FakeMistralHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json(200, {"object": "list", "data": [{"id": "mistral-tiny", "object": "model"}]})
+            else:
+                self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "not found"}})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            with config.lock:
+                config.requests += 1
+                fail = config.random.random() < config.error_rate
+                status = config.random.choice([429, 500, 503]) if fail else 200
+                if fail:
+                    config.errors += 1
+
+            time.sleep(config.latency_ms / 1000.0)
+            if fail:
+                self._send_json(status, {"error": {"message": "injected failure", "type": "server_error"}})
+                return
+
+            max_tokens = request.get("max_tokens") or config.completion_tokens
+            completion_tokens = min(config.completion_tokens, max_tokens)
+            if config.tokens_per_second:
+                time.sleep(completion_tokens / config.tokens_per_second)
+
+            prompt_text = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+            prompt_tokens = len(prompt_text) // 4 + 1
+            with config.lock:
+                content = " ".join(config.random.choice(WORDS) for _ in range(completion_tokens))
+
+            self._send_json(200, {
+                "id": f"cmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mistral-tiny"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "length" if completion_tokens >= max_tokens else "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            })
+
+    return FakeMistralHandler
+
+def start_server(config, host="127.0.0.1", port=0):
+    """Start the stub in a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Mistral chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300, help="Fixed delay before generating")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Simulated generation speed (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=200, help="Tokens per completion (capped by max_tokens)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/5xx")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = FakeMistralConfig(args.latency_ms, args.tokens_per_second, args.error_rate,
+                               args.completion_tokens, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f"🤖 Fake Mistral listening on http://{args.host}:{args.port}/v1")
+    print(f"   Set MISTRAL_API_BASE=http://{args.host}:{args.port}/v1 to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed {config.requests} requests ({config.errors} injected errors)")
+
+if __name__ == "__main__":
+    main()
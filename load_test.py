@@ -0,0 +1,173 @@
+# load_test.py - End-to-end load test of the advising flow against a (fake) Mistral endpoint
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import course_matcher
+from course_matcher import load_courses, get_recommendation_with_context, get_recommendation_with_deadline, is_error_response
+from conversation_state import ConversationState
+from profile_builder import build_student_profile
+from fake_mistral_server import FakeMistralConfig, start_server
+
+SUBJECTS = ["Mathematics", "Physics", "Chemistry", "English", "Computer Science",
+            "Accountancy", "Business Studies", "Economics", "Biology", "Physical Education"]
+
+ASPIRATIONS = [
+    "I want to become a chartered accountant who helps businesses manage their finances well",
+    "I want to design digital products and user experiences that people love to use every day",
+    "I want to work as a sports scientist helping athletes improve their performance",
+    "I want to start my own business and grow it into a successful company",
+]
+
+INTERESTS = [
+    "I enjoy accounting, economics and finance because I like working with numbers and markets",
+    "I love drawing, animation and graphic design and learning new creative tools by doing projects",
+    "I like physical education, fitness and sports science and learning how the body performs",
+    "I enjoy business studies, marketing and management and learning from real case studies",
+]
+
+ACTIVITIES = [
+    "Captain of the school football team and organized the annual sports meet",
+    "Built a website for a local charity and took part in a hackathon",
+    "President of the commerce club and ran a small online business selling art",
+    "Volunteer at an NGO and member of the school music band",
+]
+
+FOLLOW_UPS = [
+    "What are the job opportunities after this course?",
+    "Tell me more about the syllabus",
+    "How are the placements?",
+    "Can you show me other options?",
+    "What about the fees and duration?",
+    "Thanks, that helps!",
+]
+
+class StageTimer:
+    """Thread-safe collection of per-stage latencies and errors"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, stage, seconds, error=False):
+        with self.lock:
+            self.latencies.setdefault(stage, []).append(seconds)
+            if error:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def timed_turn(stage, profile, courses, messages, state, timer, deadline_ms):
+    """One advisor turn; with a deadline, time-to-answer counts the fallback as the answer"""
+    started = time.perf_counter()
+    if not deadline_ms:
+        response = get_recommendation_with_context(profile, courses, messages, state)
+        timer.record(stage, time.perf_counter() - started, is_error_response(response))
+        return response
+
+    response, pending = get_recommendation_with_deadline(profile, courses, messages, state, deadline_ms=deadline_ms)
+    timer.record(f"{stage}_time_to_answer", time.perf_counter() - started)
+    if pending is not None:
+        timer.record(f"{stage}_fallback", 0.0)
+        response = pending.result()
+    timer.record(stage, time.perf_counter() - started, is_error_response(response))
+    return response
+
+def simulate_student(student_id, courses, follow_ups, timer, rng, deadline_ms=None):
+    """Profile build -> initial recommendation -> N follow-ups for one synthetic student"""
+    started = time.perf_counter()
+    marks = {subject: rng.randint(45, 99) for subject in rng.sample(SUBJECTS, 5)}
+    profile = build_student_profile(
+        marks,
+        rng.sample(["Design", "Sports", "Technology", "Music"], rng.randint(0, 2)),
+        rng.choice(["Bachelor's Degree", "Master's Degree"]),
+        f"{rng.choice(ASPIRATIONS)} (student {student_id})",
+        rng.sample(["People", "Machines or Code", "Creative Tools", "Numbers and Data"], 2),
+        rng.choice(INTERESTS),
+        rng.choice(ACTIVITIES)
+    )
+    timer.record("profile_build", time.perf_counter() - started)
+
+    messages = []
+    state = ConversationState(courses)
+
+    response = timed_turn("initial_recommendation", profile, courses, messages, state, timer, deadline_ms)
+    messages.append({"role": "assistant", "content": response})
+
+    for _ in range(follow_ups):
+        messages.append({"role": "user", "content": rng.choice(FOLLOW_UPS)})
+        response = timed_turn("follow_up", profile, courses, messages, state, timer, deadline_ms)
+        messages.append({"role": "assistant", "content": response})
+
+def print_report(timer, students, elapsed):
+    print(f"\n📊 LOAD TEST RESULTS ({students} students in {elapsed:.1f}s)")
+    print(f"   Throughput: {students / elapsed * 60:.1f} students/min")
+    print("-" * 88)
+    print(f"{'stage':<40}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>11}")
+    for stage, values in timer.latencies.items():
+        errors = timer.errors.get(stage, 0)
+        print(f"{stage:<40}{len(values):>7}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+              f"{percentile(values, 99) * 1000:>10.1f}{errors / len(values):>10.1%}")
+    all_requests = sum(len(v) for s, v in timer.latencies.items() if s in ("initial_recommendation", "follow_up"))
+    print(f"   Requests/s to LLM endpoint: {all_requests / elapsed:.1f}")
+    print(f"   Mean stage latency: {statistics.mean(v for vs in timer.latencies.values() for v in vs) * 1000:.1f} ms")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the full advising flow for many simulated students")
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--follow-ups", type=int, default=3)
+    parser.add_argument("--api-base", default=None, help="Existing endpoint; starts a local fake server if omitted")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--deadline-ms", type=float, default=None, help="Serve the deterministic fallback after this long")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    server = None
+    api_base = args.api_base
+    if api_base is None:
+        config = FakeMistralConfig(args.latency_ms, args.tokens_per_second, args.error_rate,
+                                   args.completion_tokens, args.seed)
+        server, api_base = start_server(config)
+        print(f"🤖 Started fake Mistral at {api_base}")
+
+    openai = course_matcher.get_openai()
+    openai.api_base = api_base
+    openai.api_key = openai.api_key or "load-test"
+    # Every simulated request should reach the endpoint
+    course_matcher._response_cache.clear()
+
+    courses = load_courses()
+    timer = StageTimer()
+    print(f"🚀 Simulating {args.students} students ({args.concurrency} concurrent, {args.follow_ups} follow-ups each)")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(simulate_student, i, courses, args.follow_ups, timer, random.Random(args.seed + i), args.deadline_ms)
+            for i in range(args.students)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    print_report(timer, args.students, elapsed)
+    if server:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# near_duplicates.py - MinHash/LSH near-duplicate detection for scraped courses
+import hashlib
+import re
+
+from catalog import shard_name_for_url
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.6 title similarity almost always collide
+TITLE_THRESHOLD = 0.8
+SUBJECT_THRESHOLD = 0.5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Common degree abbreviations, so "B.Com (Hons)" and "Bachelor of Commerce Honours" compare equal
+ABBREVIATIONS = {
+    "bcom": "bachelor of commerce",
+    "mcom": "master of commerce",
+    "bsc": "bachelor of science",
+    "msc": "master of science",
+    "btech": "bachelor of technology",
+    "mtech": "master of technology",
+    "bdes": "bachelor of design",
+    "mdes": "master of design",
+    "bba": "bachelor of business administration",
+    "mba": "master of business administration",
+    "bca": "bachelor of computer applications",
+    "mca": "master of computer applications",
+    "bped": "bachelor of physical education",
+    "mped": "master of physical education",
+    "hons": "honours",
+    "honors": "honours",
+}
+
+# Words that say nothing about which course a page is about
+NOISE_WORDS = {"in", "of", "the", "and", "with", "a", "colleges", "college", "bangalore", "soc", "jain", "university"}
+
+# Words two titles of the same program may differ in; any other differing word
+# (a specialization, "CA", a campus city) means the titles are different programs
+FILLER_WORDS = {
+    "in", "of", "the", "and", "with", "a", "an", "at", "for", "colleges", "college", "course", "courses",
+    "program", "programs", "programme", "top", "best", "india", "soc", "jain", "university", "ju",
+    "deemed", "to", "be", "honours", "degree", "&"
+}
+
+def normalize_title(title):
+    """Lowercase, expand degree abbreviations and drop noise words"""
+    words = []
+    for token in re.findall(r"[a-z0-9.&]+", title.lower()):
+        token = token.replace(".", "")
+        if not token:
+            continue
+        words.extend(ABBREVIATIONS.get(token, token).split())
+    return " ".join(word for word in words if word not in NOISE_WORDS)
+
+def title_shingles(title, size=3):
+    """Character shingles of the normalized title"""
+    text = normalize_title(title)
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def stem(word):
+    """Crude plural stripping so "Sciences" and "Science" are the same word"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def distinguishing_tokens(title):
+    """Stemmed title words that tell programs apart, with degree abbreviations expanded"""
+    words = set()
+    for token in re.findall(r"[a-z0-9&]+", title.lower().replace(".", "")):
+        words.update(ABBREVIATIONS.get(token, token).split())
+    return frozenset(stem(word) for word in words - FILLER_WORDS)
+
+# Words shorter than this must match exactly: "CA" and "CS" are different programs
+MIN_TYPO_LENGTH = 5
+
+def within_one_edit(a, b):
+    """Whether a and b differ by at most one inserted, deleted or substituted character"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return a[i + 1:] == b[i + 1:] if len(a) == len(b) else a[i:] == b[i + 1:]
+    return True
+
+def same_program_tokens(tokens_a, tokens_b):
+    """Equal distinguishing words, allowing one word to carry a one-character typo"""
+    only_a, only_b = tokens_a - tokens_b, tokens_b - tokens_a
+    if not only_a and not only_b:
+        return True
+    if len(only_a) != 1 or len(only_b) != 1:
+        return False
+    (a,), (b,) = only_a, only_b
+    return min(len(a), len(b)) >= MIN_TYPO_LENGTH and within_one_edit(a, b)
+
+def course_origin(course):
+    """The shard a course is written to; duplicates never span two"""
+    return course.get("catalog_source") or shard_name_for_url(course.get("source_url", ""))
+
+def _hash_token(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+# Fixed permutations so signatures are reproducible across runs
+_PERMUTATIONS = [
+    (_hash_token(f"a{i}") % (_MERSENNE_PRIME - 1) + 1, _hash_token(f"b{i}") % _MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+def minhash_signature(shingles):
+    """MinHash signature of a set of shingles"""
+    hashes = [_hash_token(shingle) for shingle in shingles]
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+def estimated_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+def subject_similarity(subjects_a, subjects_b):
+    """Jaccard similarity of subject lists (compatible if either is unknown)"""
+    set_a = {s.lower() for s in subjects_a}
+    set_b = {s.lower() for s in subjects_b}
+    if not set_a or not set_b:
+        return 1.0
+    return len(set_a & set_b) / len(set_a | set_b)
+
+def find_near_duplicate_clusters(courses, title_threshold=TITLE_THRESHOLD,
+                                 subject_threshold=SUBJECT_THRESHOLD):
+    """Group near-duplicate courses; returns clusters of indices (size >= 2).
+
+    Candidates come from LSH buckets over title MinHash signatures, so only
+    colliding pairs are compared instead of all pairs. A candidate pair is
+    merged only when it comes from the same source, its titles share the
+    same distinguishing words (up to plurals and a one-letter typo), and both the title and the subject lists are
+    similar enough. courses may be any iterable; only signatures are kept
+    in memory.
+    """
+    rows = NUM_PERM // BANDS
+    signatures = []
+    subjects = []
+    origins = []
+    tokens = []
+    buckets = {}
+
+    for index, course in enumerate(courses):
+        title = course.get("course", "")
+        signature = minhash_signature(title_shingles(title))
+        signatures.append(signature)
+        subjects.append(course.get("subjects", []))
+        origins.append(course_origin(course))
+        tokens.append(distinguishing_tokens(title))
+        for band in range(BANDS):
+            key = (band, signature[band * rows:(band + 1) * rows])
+            buckets.setdefault(key, []).append(index)
+
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    checked = set()
+    for members in buckets.values():
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if origins[i] != origins[j] or not same_program_tokens(tokens[i], tokens[j]):
+                    continue
+                if (estimated_similarity(signatures[i], signatures[j]) >= title_threshold
+                        and subject_similarity(subjects[i], subjects[j]) >= subject_threshold):
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = {}
+    for index in range(len(signatures)):
+        clusters.setdefault(find(index), []).append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+def merge_cluster(cluster_courses):
+    """Merge a cluster into its first course, keeping the other titles and URLs as aliases"""
+    merged = dict(cluster_courses[0])
+    subjects = list(merged.get("subjects", []))
+    aliases = []
+    alternate_urls = []
+
+    for course in cluster_courses[1:]:
+        for subject in course.get("subjects", []):
+            if subject not in subjects:
+                subjects.append(subject)
+        if course.get("course") and course["course"] != merged.get("course"):
+            aliases.append(course["course"])
+        if course.get("source_url") and course["source_url"] != merged.get("source_url"):
+            alternate_urls.append(course["source_url"])
+
+    merged["subjects"] = subjects
+    if aliases:
+        merged["aliases"] = aliases
+    if alternate_urls:
+        merged["alternate_urls"] = alternate_urls
+    return merged
+
+def report_clusters(clusters, courses):
+    """Print the merged clusters (courses maps index -> course)"""
+    print(f"🔁 Near-duplicate clusters merged: {len(clusters)}")
+    for members in clusters:
+        print(f"  - {courses[members[0]]['course']}")
+        for index in members[1:]:
+            print(f"      ≈ {courses[index]['course']} ({courses[index].get('source_url', '')})")
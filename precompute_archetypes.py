@@ -0,0 +1,162 @@
+# precompute_archetypes.py - Offline job that fills the archetype recommendation table
+import argparse
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+
+from archetypes import ARCHETYPES_PATH, archetype_key, catalog_fingerprint, load_table, save_table
+from course_matcher import (
+    assemble_prompt, format_course_entry, get_openai, load_courses, matched_signals, ranked_courses
+)
+from profile_builder import ACTIVITY_INTERESTS, ACTIVITY_SKILL_MAPPING, INTEREST_MAPPING
+
+DEGREE_LEVELS = ["Bachelor's Degree", "Master's Degree"]
+CLOSING_QUESTION = "Would you like me to explain more about any of these courses, or would you prefer to explore other options?"
+
+def archetype_profile(degree_level, interests, activities):
+    """A profile with placeholders where the student's own details go"""
+    skills = sorted({skill for activity in activities for skill in ACTIVITY_SKILL_MAPPING[activity]["skills"]})
+    return {
+        "degree_level": degree_level,
+        "interests": sorted(interests),
+        "activities": sorted(activities),
+        "derived_skills": skills,
+        "strengths": "{strengths}",
+        "aspiration": "{aspiration}"
+    }
+
+def enumerate_archetypes(max_interests=1, max_activities=1, degree_levels=DEGREE_LEVELS):
+    """Every reachable (degree level, interests, activities) combination up to the given sizes"""
+    archetypes = {}
+    for degree_level in degree_levels:
+        for n_activities in range(max_activities + 1):
+            for activities in combinations(sorted(ACTIVITY_SKILL_MAPPING), n_activities):
+                # Activities always contribute their implied interests
+                implied = {ACTIVITY_INTERESTS[a] for a in activities if a in ACTIVITY_INTERESTS}
+                for n_interests in range(max_interests + 1):
+                    for interests in combinations(sorted(INTEREST_MAPPING), n_interests):
+                        profile = archetype_profile(degree_level, set(interests) | implied, activities)
+                        archetypes.setdefault(archetype_key(profile), profile)
+    return list(archetypes.values())
+
+def mine_archetypes(paths, top):
+    """Most frequent archetypes among recorded profiles (JSONL records with a "profile")"""
+    counts = Counter()
+    examples = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    profile = json.loads(line).get("profile")
+                except json.JSONDecodeError:
+                    continue
+                if not profile or profile.get("needs_clarification"):
+                    continue
+                key = archetype_key(profile)
+                counts[key] += 1
+                examples.setdefault(key, archetype_profile(profile.get("degree_level", "Bachelor's Degree"),
+                                                           profile.get("interests", []),
+                                                           profile.get("activities", [])))
+    return [examples[key] for key, _ in counts.most_common(top)]
+
+def deterministic_template(profile, ranked):
+    """Rationale template built from the matching signals alone"""
+    lines = [f"Based on your strengths in {{strengths}}, here are {profile['degree_level']} courses that could be a great fit:\n"]
+    for i, course in enumerate(ranked, 1):
+        lines.append(f"### {i}. {course.get('course', '')}")
+        interests, _ = matched_signals(course, profile)
+        if interests:
+            reason = f"It connects directly to your interest in {', '.join(interests)}."
+        else:
+            reason = "It is a strong all-round option at your degree level."
+        if course.get("degree"):
+            reason = f"Part of {course['degree']}. {reason}"
+        lines.append(reason)
+        lines.append(f"🔗 {course.get('source_url', '')}\n")
+    lines.append(CLOSING_QUESTION)
+    return "\n".join(lines)
+
+def generate_template(profile, ranked):
+    """LLM-written rationale that keeps {strengths} and {aspiration} as placeholders"""
+    catalog = "".join(format_course_entry(course) for course in ranked)
+    task = f"""Your task:
+1. Recommend each of the listed {profile['degree_level']} courses, in the order given
+2. For each course, explain WHY it fits the student's interests, activities and derived skills, using second person (you/your)
+3. Include the course URL for each recommendation
+4. Refer to the student's top subjects ONLY as the literal text {{strengths}} and to their career aspiration ONLY as the literal text {{aspiration}} - these are filled in later, so copy them exactly
+
+End by asking: "{CLOSING_QUESTION}"
+"""
+    prompt = assemble_prompt(profile=profile, catalog=catalog, degree_level=profile["degree_level"], task=task)
+    response = get_openai().ChatCompletion.create(
+        model="mistral-tiny",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.7,
+        max_tokens=800
+    )
+    return response["choices"][0]["message"]["content"]
+
+def build_entry(profile, courses, limit, use_llm):
+    ranked = ranked_courses(courses, profile, limit)
+    entry = {
+        "degree_level": profile["degree_level"],
+        "interests": profile["interests"],
+        "activities": profile["activities"],
+        "courses": [{"course": c.get("course", ""), "source_url": c.get("source_url", "")} for c in ranked],
+        "source": "deterministic"
+    }
+    template = None
+    if use_llm and ranked:
+        try:
+            template = generate_template(profile, ranked)
+            entry["source"] = "llm"
+        except Exception as e:
+            print(f"⚠️ LLM failed for {archetype_key(profile)}: {e}")
+    entry["template"] = template or deterministic_template(profile, ranked)
+    return archetype_key(profile), entry
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute initial recommendations for common profile archetypes")
+    parser.add_argument("--profiles", nargs="*", default=[], help="JSONL files of recorded profiles to mine (e.g. batch_results.jsonl)")
+    parser.add_argument("--top", type=int, default=200, help="How many of the most frequent mined archetypes to keep")
+    parser.add_argument("--enumerate", action="store_true", help="Also enumerate all small archetypes")
+    parser.add_argument("--max-interests", type=int, default=1)
+    parser.add_argument("--max-activities", type=int, default=1)
+    parser.add_argument("--courses-per-entry", type=int, default=4)
+    parser.add_argument("--no-llm", action="store_true", help="Store deterministic templates only")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--output", default=ARCHETYPES_PATH)
+    parser.add_argument("--refresh", action="store_true", help="Regenerate entries that already exist")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    courses = load_courses()
+    fingerprint = catalog_fingerprint(courses)
+
+    profiles = mine_archetypes(args.profiles, args.top) if args.profiles else []
+    if args.enumerate or not args.profiles:
+        profiles += enumerate_archetypes(args.max_interests, args.max_activities)
+
+    # Keep existing entries unless the catalog changed or a refresh was asked for
+    entries = {}
+    existing = load_table(args.output)
+    if existing and existing.get("catalog_fingerprint") == fingerprint and not args.refresh:
+        entries = dict(existing["entries"])
+    todo = {archetype_key(p): p for p in profiles if archetype_key(p) not in entries}
+
+    print(f"🧮 {len(todo)} archetype(s) to generate ({len(entries)} already cached)")
+    with ThreadPoolExecutor(max_workers=args.llm_concurrency) as pool:
+        for i, (key, entry) in enumerate(pool.map(
+                lambda p: build_entry(p, courses, args.courses_per_entry, not args.no_llm), todo.values()), 1):
+            entries[key] = entry
+            if i % 25 == 0:
+                save_table(entries, fingerprint, args.output)
+                print(f"   {i}/{len(todo)} generated")
+
+    save_table(entries, fingerprint, args.output)
+    print(f"💾 Saved {len(entries)} archetype(s) to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# prefetch.py - Opt-in speculative answers to the most likely follow-up questions
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from course_mentions import get_mention_detector
+from course_matcher import GENERATION_PROFILES, get_recommendation_with_context, is_error_response
+from tracing import increment_counter
+
+# Predicted follow-ups about the top recommended course, most likely first
+PREFETCH_QUESTIONS = {
+    "jobs": "What are the job opportunities after {course}?",
+    "syllabus": "Tell me more about the syllabus of {course}",
+    "placements": "How are the placements for {course}?"
+}
+
+# Words that tie a real question to one of the prefetched topics
+TOPIC_PATTERNS = {
+    "jobs": re.compile(r"\b(jobs?|careers?|employment|salary|salaries|opportunit\w*|scope|future)\b"),
+    "syllabus": re.compile(r"\b(syllabus|subjects|curriculum|modules|semesters?)\b"),
+    "placements": re.compile(r"\b(placements?|placed|recruit\w*|compan(y|ies)|internships?)\b")
+}
+
+def _lower_priority():
+    """Worker initializer: deprioritize prefetch threads so live requests win the CPU"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+# One shared low-priority pool for all sessions
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch", initializer=_lower_priority)
+
+def question_topic(message):
+    """The single prefetch topic a question is about, or None if it's about none or several"""
+    message_lower = message.lower()
+    topics = [topic for topic, pattern in TOPIC_PATTERNS.items() if pattern.search(message_lower)]
+    return topics[0] if len(topics) == 1 else None
+
+class Prefetcher:
+    """Speculatively answers predicted follow-ups for one session while the student reads.
+
+    Answers are generated with the same context-prompt path as real turns,
+    against the exact chat history the student is looking at, and capped by
+    a per-session token budget. lookup() serves a prefetched answer only for
+    the next turn, when the question's course and topic match.
+    """
+
+    def __init__(self, top_n=2, token_budget=1500):
+        self.top_n = top_n
+        self.token_budget = token_budget
+        self.tokens_reserved = 0
+        self.lock = threading.Lock()
+        self.history_length = None
+        self.course = None
+        self.answers = {}  # topic -> Future
+        self.lookups = 0
+        self.hits = 0
+
+    def prefetch_after(self, profile, courses, chat_history):
+        """Start prefetching after the initial recommendation (no-op once started)"""
+        if self.history_length is not None or profile.get("needs_clarification"):
+            return False
+        if not chat_history or chat_history[-1].get("role") != "assistant":
+            return False
+
+        mentions = get_mention_detector(courses).mentions(chat_history[-1].get("content", ""))
+        if not mentions:
+            return False
+        self.course = mentions[0]
+        self.history_length = len(chat_history)
+
+        history = list(chat_history)
+        cost = GENERATION_PROFILES["specific_course"]["max_tokens"]
+        for topic, template in list(PREFETCH_QUESTIONS.items())[:self.top_n]:
+            with self.lock:
+                if self.tokens_reserved + cost > self.token_budget:
+                    increment_counter("advisor_prefetch_skipped_total", "budget")
+                    break
+                self.tokens_reserved += cost
+            synthetic = history + [{"role": "user", "content": template.format(course=self.course)}]
+            self.answers[topic] = _prefetch_pool.submit(get_recommendation_with_context, profile, courses, synthetic)
+            increment_counter("advisor_prefetch_started_total", topic)
+        return True
+
+    def lookup(self, chat_history, state):
+        """The prefetched answer for the latest user message, or None.
+
+        Only a finished answer is served: waiting on one still being generated
+        would eat into the response deadline before the fresh request starts.
+        """
+        if self.history_length is None or len(chat_history) != self.history_length + 1:
+            return None
+        self.lookups += 1
+        state.update(chat_history)
+        topic = question_topic(state.latest_user_message)
+        increment_counter("advisor_prefetch_lookups_total", topic or "none")
+
+        future = self.answers.get(topic)
+        if future is None or not future.done() or (state.specific_course or state.recent_course()) != self.course:
+            return None
+        try:
+            response = future.result()
+        except Exception:
+            return None
+        if is_error_response(response):
+            return None
+
+        self.hits += 1
+        increment_counter("advisor_prefetch_hits_total", topic)
+        return response
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
@@ -1,12 +1,23 @@
-import pdfplumber
+import logging
 import re
 
-import pdfplumber
-import re
+from app_logging import get_logger
+from tracing import traced
+
+logger = get_logger("profile_builder")
+
+@traced("extract_marks_from_pdf")
+def extract_marks_from_pdf(pdf_path, sample_fallback=True):
+    """Extract marks from PDF with improved parsing.
+
+    With sample_fallback=False an unreadable PDF raises instead of returning sample marks.
+    """
+    # Imported on first use: pdfplumber pulls in the whole pdfminer stack
+    import pdfplumber
 
-def extract_marks_from_pdf(pdf_path):
-    """Extract marks from PDF with improved parsing"""
     marks = {}
+    # Checked once so the per-line loop pays nothing when debug is off
+    debug = logger.isEnabledFor(logging.DEBUG)
     try:
         with pdfplumber.open(pdf_path) as pdf:
             full_text = ""
@@ -15,7 +26,9 @@ def extract_marks_from_pdf(pdf_path):
                 if page_text:
                     full_text += page_text + "\n"
             
-            print(f"Extracted PDF text: {full_text[:500]}...")  # Debug print
+            # Never log the marksheet text itself, only its shape
+            if debug:
+                logger.debug("Extracted PDF text", extra={"fields": {"pages": len(pdf.pages), "chars": len(full_text)}})
             
             # Try multiple patterns to extract marks
             patterns = [
@@ -45,13 +58,14 @@ def extract_marks_from_pdf(pdf_path):
                             score = int(score_str)
                             if 0 <= score <= 100:  # Valid percentage range
                                 marks[subject] = score
-                                print(f"Found: {subject} = {score}%")  # Debug print
+                                if debug:
+                                    logger.debug("Matched subject", extra={"fields": {"subject": subject}})
                         except ValueError:
                             continue
             
             # If no marks found, try a more lenient approach
             if not marks:
-                print("No marks found with standard patterns, trying lenient parsing...")
+                logger.info("No marks found with standard patterns, trying lenient parsing")
                 # Look for any numbers that might be scores
                 words_and_numbers = re.findall(r'([A-Za-z]+(?:\s+[A-Za-z]+)*)\s*[:\-]?\s*(\d{1,3})', full_text)
                 for subject, score_str in words_and_numbers:
@@ -60,12 +74,15 @@ def extract_marks_from_pdf(pdf_path):
                         score = int(score_str)
                         if 30 <= score <= 100 and len(subject) >= 3:  # Reasonable score range
                             marks[subject] = score
-                            print(f"Lenient parsing found: {subject} = {score}%")
+                            if debug:
+                                logger.debug("Lenient match", extra={"fields": {"subject": subject}})
                     except ValueError:
                         continue
                         
     except Exception as e:
-        print(f"Error reading PDF: {e}")
+        logger.warning("Error reading PDF: %s", type(e).__name__)
+        if not sample_fallback:
+            raise
         # Return some sample data for testing
         marks = {
             "Mathematics": 85,
@@ -74,11 +91,118 @@ def extract_marks_from_pdf(pdf_path):
             "English": 88,
             "Computer Science": 92
         }
-        print("Using sample marks data for testing")
+        logger.warning("Using sample marks data for testing")
     
-    print(f"Final extracted marks: {marks}")
+    logger.info("Extracted marks", extra={"fields": {"subjects": len(marks)}})
     return marks
 
+# Comprehensive interest mapping - all categories treated equally
+INTEREST_MAPPING = {
+    "Technology": [
+        "technology", "tech", "computer", "programming", "coding", "software", "ai", 
+        "artificial intelligence", "machine learning", "data science", "web development",
+        "app development", "python", "java", "javascript", "cybersecurity", "robotics"
+    ],
+    "Design": [
+        "design", "graphic", "visual", "creative", "art", "drawing", "painting", "sketch",
+        "ui", "ux", "user experience", "illustration", "photography", "animation",
+        "web design", "interior design", "fashion design", "product design"
+    ],
+    "Business": [
+        "business", "management", "entrepreneur", "entrepreneurship", "startup", "finance",
+        "accounting", "marketing", "sales", "commerce", "economics", "consulting",
+        "leadership", "strategy", "project management", "operations"
+    ],
+    "Science": [
+        "science", "physics", "chemistry", "biology", "research", "laboratory", "experiment",
+        "analysis", "statistics", "mathematics", "math", "environmental science",
+        "biotechnology", "medical research", "clinical research"
+    ],
+    "Sports": [
+        "sports", "sport", "athletics", "running", "fitness", "gym", "exercise", "swimming",
+        "football", "basketball", "tennis", "cricket", "cycling", "yoga", "dance",
+        "physical education", "coaching", "competition", "team sports"
+    ],
+    "Communication": [
+        "communication", "writing", "journalism", "media", "public speaking", "presentation",
+        "content creation", "blogging", "social media", "broadcasting", "storytelling",
+        "copywriting", "editing", "publishing", "reporting"
+    ],
+    "Music": [
+        "music", "singing", "instrument", "piano", "guitar", "drums", "composition",
+        "performing", "band", "orchestra", "concert", "recording", "audio"
+    ],
+    "Literature": [
+        "literature", "reading", "books", "poetry", "writing", "stories", "novels",
+        "language", "linguistics", "creative writing", "translation", "cultural studies"
+    ],
+    "Social Work": [
+        "social", "community", "helping", "volunteering", "service", "charity",
+        "social work", "counseling", "teaching", "education", "mentoring",
+        "non-profit", "activism", "welfare", "healthcare", "psychology"
+    ],
+    "Engineering": [
+        "engineering", "engineer", "mechanical", "electrical", "civil", "chemical",
+        "aerospace", "biomedical", "industrial", "construction", "manufacturing",
+        "automation", "systems", "technical", "innovation"
+    ]
+}
+
+# Activity patterns with derived skills (Medium weightage)
+ACTIVITY_SKILL_MAPPING = {
+    # Leadership activities
+    "Leadership": {
+        "activities": ["president", "leader", "captain", "head", "coordinator", "organize", "lead team"],
+        "skills": ["Leadership", "Team Management", "Organization"]
+    },
+    # Technical activities  
+    "Technical Projects": {
+        "activities": ["coding", "programming", "hackathon", "tech", "app", "website", "software", "project"],
+        "skills": ["Technical Skills", "Problem Solving", "Innovation"]
+    },
+    # Creative activities
+    "Creative Arts": {
+        "activities": ["art", "design", "painting", "photography", "creative", "drawing", "graphics"],
+        "skills": ["Creativity", "Visual Communication", "Artistic Expression"]
+    },
+    # Sports activities
+    "Sports & Athletics": {
+        "activities": ["sports", "athletics", "team", "competition", "tournament", "fitness", "captain"],
+        "skills": ["Teamwork", "Discipline", "Physical Fitness", "Competitive Spirit"]
+    },
+    # Community service
+    "Community Service": {
+        "activities": ["volunteer", "community", "service", "ngo", "charity", "social", "help"],
+        "skills": ["Social Responsibility", "Empathy", "Communication"]
+    },
+    # Academic competitions
+    "Academic Excellence": {
+        "activities": ["competition", "olympiad", "quiz", "debate", "research", "science fair"],
+        "skills": ["Analytical Thinking", "Research Skills", "Academic Excellence"]
+    },
+    # Performance activities
+    "Performance & Arts": {
+        "activities": ["music", "dance", "theater", "performance", "singing", "acting"],
+        "skills": ["Performance Skills", "Confidence", "Cultural Awareness"]
+    },
+    # Business activities
+    "Business & Entrepreneurship": {
+        "activities": ["business", "entrepreneur", "startup", "internship", "work", "sales"],
+        "skills": ["Business Acumen", "Professional Skills", "Initiative"]
+    }
+}
+
+# Interest implied by each activity category (activities carry medium weight)
+ACTIVITY_INTERESTS = {
+    "Technical Projects": "Technology",
+    "Creative Arts": "Design",
+    "Sports & Athletics": "Sports",
+    "Business & Entrepreneurship": "Business",
+    "Community Service": "Social Work",
+    "Performance & Arts": "Music",
+    "Academic Excellence": "Science"
+}
+
 def extract_interests_from_text(interest_text):
     """Extract interests from the student's text response with comprehensive detection"""
     if not interest_text:
@@ -87,65 +211,14 @@ def extract_interests_from_text(interest_text):
     interests = []
     text_lower = interest_text.lower()
     
-    # Comprehensive interest mapping - all categories treated equally
-    interest_mapping = {
-        "Technology": [
-            "technology", "tech", "computer", "programming", "coding", "software", "ai", 
-            "artificial intelligence", "machine learning", "data science", "web development",
-            "app development", "python", "java", "javascript", "cybersecurity", "robotics"
-        ],
-        "Design": [
-            "design", "graphic", "visual", "creative", "art", "drawing", "painting", "sketch",
-            "ui", "ux", "user experience", "illustration", "photography", "animation",
-            "web design", "interior design", "fashion design", "product design"
-        ],
-        "Business": [
-            "business", "management", "entrepreneur", "entrepreneurship", "startup", "finance",
-            "accounting", "marketing", "sales", "commerce", "economics", "consulting",
-            "leadership", "strategy", "project management", "operations"
-        ],
-        "Science": [
-            "science", "physics", "chemistry", "biology", "research", "laboratory", "experiment",
-            "analysis", "statistics", "mathematics", "math", "environmental science",
-            "biotechnology", "medical research", "clinical research"
-        ],
-        "Sports": [
-            "sports", "sport", "athletics", "running", "fitness", "gym", "exercise", "swimming",
-            "football", "basketball", "tennis", "cricket", "cycling", "yoga", "dance",
-            "physical education", "coaching", "competition", "team sports"
-        ],
-        "Communication": [
-            "communication", "writing", "journalism", "media", "public speaking", "presentation",
-            "content creation", "blogging", "social media", "broadcasting", "storytelling",
-            "copywriting", "editing", "publishing", "reporting"
-        ],
-        "Music": [
-            "music", "singing", "instrument", "piano", "guitar", "drums", "composition",
-            "performing", "band", "orchestra", "concert", "recording", "audio"
-        ],
-        "Literature": [
-            "literature", "reading", "books", "poetry", "writing", "stories", "novels",
-            "language", "linguistics", "creative writing", "translation", "cultural studies"
-        ],
-        "Social Work": [
-            "social", "community", "helping", "volunteering", "service", "charity",
-            "social work", "counseling", "teaching", "education", "mentoring",
-            "non-profit", "activism", "welfare", "healthcare", "psychology"
-        ],
-        "Engineering": [
-            "engineering", "engineer", "mechanical", "electrical", "civil", "chemical",
-            "aerospace", "biomedical", "industrial", "construction", "manufacturing",
-            "automation", "systems", "technical", "innovation"
-        ]
-    }
     
     # Simple detection - no bias, no scoring, all interests treated equally  
-    for category, keywords in interest_mapping.items():
+    for category, keywords in INTEREST_MAPPING.items():
         if any(keyword in text_lower for keyword in keywords):
             interests.append(category)
     
-    # Remove duplicates and return
-    return list(set(interests))
+    # Remove duplicates and return (sorted so profiles serialize deterministically)
+    return sorted(set(interests))
 
 def extract_activities_and_skills(activities_text):
     """Extract specific activities and derive skills - MEDIUM WEIGHTAGE"""
@@ -156,52 +229,9 @@ def extract_activities_and_skills(activities_text):
     derived_skills = []
     text_lower = activities_text.lower()
     
-    # Activity patterns with derived skills (Medium weightage)
-    activity_skill_mapping = {
-        # Leadership activities
-        "Leadership": {
-            "activities": ["president", "leader", "captain", "head", "coordinator", "organize", "lead team"],
-            "skills": ["Leadership", "Team Management", "Organization"]
-        },
-        # Technical activities  
-        "Technical Projects": {
-            "activities": ["coding", "programming", "hackathon", "tech", "app", "website", "software", "project"],
-            "skills": ["Technical Skills", "Problem Solving", "Innovation"]
-        },
-        # Creative activities
-        "Creative Arts": {
-            "activities": ["art", "design", "painting", "photography", "creative", "drawing", "graphics"],
-            "skills": ["Creativity", "Visual Communication", "Artistic Expression"]
-        },
-        # Sports activities
-        "Sports & Athletics": {
-            "activities": ["sports", "athletics", "team", "competition", "tournament", "fitness", "captain"],
-            "skills": ["Teamwork", "Discipline", "Physical Fitness", "Competitive Spirit"]
-        },
-        # Community service
-        "Community Service": {
-            "activities": ["volunteer", "community", "service", "ngo", "charity", "social", "help"],
-            "skills": ["Social Responsibility", "Empathy", "Communication"]
-        },
-        # Academic competitions
-        "Academic Excellence": {
-            "activities": ["competition", "olympiad", "quiz", "debate", "research", "science fair"],
-            "skills": ["Analytical Thinking", "Research Skills", "Academic Excellence"]
-        },
-        # Performance activities
-        "Performance & Arts": {
-            "activities": ["music", "dance", "theater", "performance", "singing", "acting"],
-            "skills": ["Performance Skills", "Confidence", "Cultural Awareness"]
-        },
-        # Business activities
-        "Business & Entrepreneurship": {
-            "activities": ["business", "entrepreneur", "startup", "internship", "work", "sales"],
-            "skills": ["Business Acumen", "Professional Skills", "Initiative"]
-        }
-    }
     
     # Extract activities and derive skills
-    for category, data in activity_skill_mapping.items():
+    for category, data in ACTIVITY_SKILL_MAPPING.items():
         activity_keywords = data["activities"]
         skills = data["skills"]
         
@@ -210,7 +240,8 @@ def extract_activities_and_skills(activities_text):
             activities.append(category)
             derived_skills.extend(skills)
     
-    return list(set(activities)), list(set(derived_skills))
+    return sorted(set(activities)), sorted(set(derived_skills))
+@traced("extract_interests_from_certificates")
 def extract_interests_from_certificates(cert_paths):
     keywords = {
         "design": "Design",
@@ -226,6 +257,8 @@ def extract_interests_from_certificates(cert_paths):
         "programming": "Technology",
     }
 
+    import pdfplumber
+
     interests = set()
 
     for path in cert_paths:
@@ -237,69 +270,86 @@ def extract_interests_from_certificates(cert_paths):
                     if kw in text:
                         interests.add(label)
         except Exception as e:
-            print(f"Error reading certificate {path}: {e}")
+            logger.warning("Error reading certificate: %s", type(e).__name__)
             continue
 
-    return list(interests)
+    return sorted(interests)
+
+# Points each profile area adds to the completeness score (also the order questions are asked in)
+COMPLETENESS_WEIGHTS = {
+    "academic performance data": 25,
+    "demonstrated interests from certificates": 20,
+    "detailed career aspiration": 25,
+    "detailed subject preferences": 20,
+    "extracurricular activities": 10
+}
+
+CLARIFYING_QUESTIONS = {
+    "academic performance data": "I'd like to understand your academic strengths better. Could you tell me which subjects you scored highest in and what grades you achieved?",
+    "demonstrated interests from certificates": "What activities, hobbies, or skills have you pursued outside of regular academics? Any competitions, workshops, or certifications?",
+    "detailed career aspiration": "Could you elaborate more on your career goals? What specific role do you see yourself in, and what impact do you want to make?",
+    "detailed subject preferences": "Tell me more about the subjects that excite you most. What specific topics within these subjects fascinate you, and how do you like to learn them?",
+    "extracurricular activities": "Have you been involved in any projects, clubs, volunteering, internships, or other activities? These help me understand your broader interests and skills."
+}
+
+def area_is_complete(area, marks, interests, aspiration, favorite_subjects, extra_curricular):
+    """Whether we have enough information about one profile area"""
+    if area == "academic performance data":
+        return bool(marks) and len(marks) >= 3
+    if area == "demonstrated interests from certificates":
+        return bool(interests) and len(interests) >= 1
+    if area == "detailed career aspiration":
+        return bool(aspiration) and len(aspiration.split()) >= 8
+    if area == "detailed subject preferences":
+        return bool(favorite_subjects) and len(favorite_subjects.split()) >= 10
+    if area == "extracurricular activities":
+        return bool(extra_curricular) and len(extra_curricular.split()) >= 5
+    return True
 
 def analyze_profile_completeness(marks, interests, aspiration, work_preference, favorite_subjects, extra_curricular):
     """Analyze if we have enough information about the student"""
     completeness_score = 0
     missing_areas = []
     
-    # Check marks data
-    if marks and len(marks) >= 3:
-        completeness_score += 25
-    else:
-        missing_areas.append("academic performance data")
-    
-    # Check interests from certificates
-    if interests and len(interests) >= 1:
-        completeness_score += 20
-    else:
-        missing_areas.append("demonstrated interests from certificates")
-    
-    # Check aspiration detail
-    if aspiration and len(aspiration.split()) >= 8:
-        completeness_score += 25
-    else:
-        missing_areas.append("detailed career aspiration")
-    
-    # Check favorite subjects detail
-    if favorite_subjects and len(favorite_subjects.split()) >= 10:
-        completeness_score += 20
-    else:
-        missing_areas.append("detailed subject preferences")
-    
-    # Check extracurricular activities
-    if extra_curricular and len(extra_curricular.split()) >= 5:
-        completeness_score += 10
-    else:
-        missing_areas.append("extracurricular activities")
+    for area, weight in COMPLETENESS_WEIGHTS.items():
+        if area_is_complete(area, marks, interests, aspiration, favorite_subjects, extra_curricular):
+            completeness_score += weight
+        else:
+            missing_areas.append(area)
     
     return completeness_score, missing_areas
 
+def reassess_profile_completeness(profile, areas):
+    """Re-check only the given areas after new answers were folded into the profile"""
+    inputs = (
+        profile.get("marks_data"),
+        profile.get("interests"),
+        profile.get("aspiration", ""),
+        " ".join(profile.get("favorite_subjects") or []),
+        profile.get("extra_curricular_details", "")
+    )
+    missing = set(profile.get("missing_areas", []))
+    score = profile.get("completeness_score", 0)
+    for area in areas:
+        complete = area_is_complete(area, *inputs)
+        if complete and area in missing:
+            missing.discard(area)
+            score += COMPLETENESS_WEIGHTS[area]
+        elif not complete and area not in missing:
+            missing.add(area)
+            score -= COMPLETENESS_WEIGHTS[area]
+    
+    profile["completeness_score"] = score
+    profile["missing_areas"] = [area for area in COMPLETENESS_WEIGHTS if area in missing]
+    profile["needs_clarification"] = score < 70
+    profile["clarifying_questions"] = generate_clarifying_questions(profile["missing_areas"], profile) if profile["needs_clarification"] else []
+    return profile
+
 def generate_clarifying_questions(missing_areas, existing_profile):
     """Generate questions to gather more information"""
-    questions = []
-    
-    if "academic performance data" in missing_areas:
-        questions.append("I'd like to understand your academic strengths better. Could you tell me which subjects you scored highest in and what grades you achieved?")
-    
-    if "demonstrated interests from certificates" in missing_areas:
-        questions.append("What activities, hobbies, or skills have you pursued outside of regular academics? Any competitions, workshops, or certifications?")
-    
-    if "detailed career aspiration" in missing_areas:
-        questions.append("Could you elaborate more on your career goals? What specific role do you see yourself in, and what impact do you want to make?")
-    
-    if "detailed subject preferences" in missing_areas:
-        questions.append("Tell me more about the subjects that excite you most. What specific topics within these subjects fascinate you, and how do you like to learn them?")
-    
-    if "extracurricular activities" in missing_areas:
-        questions.append("Have you been involved in any projects, clubs, volunteering, internships, or other activities? These help me understand your broader interests and skills.")
-    
-    return questions
+    return [question for area, question in CLARIFYING_QUESTIONS.items() if area in missing_areas]
 
+@traced("build_student_profile")
 def build_student_profile(marks, interests_from_certs, degree_level, q1, q2, q3, q4):
     # Sort subjects by marks to identify strengths
     sorted_subjects = sorted(marks.items(), key=lambda x: x[1], reverse=True) if marks else []
@@ -315,25 +365,10 @@ def build_student_profile(marks, interests_from_certs, degree_level, q1, q2, q3,
     all_interests = list(set(interests_from_certs + interests_from_text))
     
     # Add activity-derived interests to main interests (increasing activity weightage)
-    activity_interests = []
-    for activity in activities:
-        if "Technical" in activity:
-            activity_interests.append("Technology")
-        elif "Creative" in activity:
-            activity_interests.append("Design")
-        elif "Sports" in activity:
-            activity_interests.append("Sports")
-        elif "Business" in activity:
-            activity_interests.append("Business")
-        elif "Community" in activity:
-            activity_interests.append("Social Work") 
-        elif "Performance" in activity:
-            activity_interests.append("Music")
-        elif "Academic" in activity:
-            activity_interests.append("Science")
+    activity_interests = [ACTIVITY_INTERESTS[activity] for activity in activities if activity in ACTIVITY_INTERESTS]
     
     # Combine all interests - activities now have medium weight
-    all_interests = list(set(all_interests + activity_interests))
+    all_interests = sorted(set(all_interests + activity_interests))
 
     # Analyze profile completeness
     completeness_score, missing_areas = analyze_profile_completeness(marks, all_interests, q1, q2, q3, q4)
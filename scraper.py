@@ -1,15 +1,26 @@
 # scraper.py - Simple approach: Body content only
 import requests
 from bs4 import BeautifulSoup
+import argparse
 import json
+import logging
+import re
 from urllib.parse import urljoin
 import time
+from app_logging import configure_logging, get_logger
+from catalog import shard_name_for_url
+from crawler import HEADERS, CrawlFrontier, fetch_sitemap_urls, same_site
+from crawl_journal import JOURNAL_PATH, CrawlJournal, load_journal
+from course_stream import STREAM_PATH, StreamingCourseWriter, compact_courses, iter_courses_jsonl
+from course_retrieval import CHUNKS_PATH, ChunkWriter
 
 # Load URLs from scrape_urls.json
 with open("scrape_urls.json") as f:
     url_config = json.load(f)
 urls = url_config["urls"]
 
+logger = get_logger("scraper")
+
 def remove_navigation_elements(soup):
     """Remove header, footer, and navigation elements"""
     elements_to_remove = [
@@ -41,21 +52,24 @@ def get_body_content(soup):
     # Fallback to body
     return soup.find('body') or soup
 
-def extract_course_links_from_body(url):
-    """Extract course links from body content only"""
-    print(f"Scraping body content from: {url}")
-    
+def fetch_page(url, timeout=15):
+    """Fetch a page and parse it, or return None on failure"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=15)
+        response = requests.get(url, headers=HEADERS, timeout=timeout)
         response.raise_for_status()
     except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return []
+        logger.warning("Error fetching %s: %s", url, e)
+        return None
+
+    return BeautifulSoup(response.text, "html.parser")
 
-    soup = BeautifulSoup(response.text, "html.parser")
+def extract_course_links_from_body(url):
+    """Extract course links from body content only"""
+    logger.info("Scraping body content from: %s", url)
+    
+    soup = fetch_page(url)
+    if soup is None:
+        return []
     
     # Remove navigation elements
     soup = remove_navigation_elements(soup)
@@ -63,8 +77,13 @@ def extract_course_links_from_body(url):
     # Get only body content
     body_content = get_body_content(soup)
     
+    return extract_course_links_from_content(body_content, url)
+
+def extract_course_links_from_content(body_content, url):
+    """Extract course links from already cleaned body content"""
     course_links = []
     processed_links = set()
+    debug = logger.isEnabledFor(logging.DEBUG)
     
     # Find all links in body content
     links = body_content.find_all('a', href=True)
@@ -81,20 +100,23 @@ def extract_course_links_from_body(url):
             continue
             
         # Look for course-related links
-        if is_likely_course_link(href, text):
+        score = score_course_link(href, text)
+        if score > 0:
             full_url = urljoin(url, href)
             course_links.append({
                 'url': full_url,
                 'text': text,
-                'source_url': url
+                'source_url': url,
+                'score': score
             })
             processed_links.add(href)
-            print(f"Found course link: {text}")
+            if debug:
+                logger.debug("Found course link: %s", text, extra={"fields": {"score": score}})
     
     return course_links
 
-def is_likely_course_link(href, text):
-    """Check if link is likely a course page"""
+def score_course_link(href, text):
+    """Score how likely a link is to lead to a course page (0 = not a course link)"""
     href_lower = href.lower()
     text_lower = text.lower()
     
@@ -111,33 +133,33 @@ def is_likely_course_link(href, text):
     ]
     
     # Check URL
-    has_course_url = any(pattern in href_lower for pattern in course_url_patterns)
+    url_hits = sum(1 for pattern in course_url_patterns if pattern in href_lower)
     
     # Check text (must be substantial)
-    has_course_text = (
-        any(pattern in text_lower for pattern in course_text_patterns) and
-        len(text.split()) >= 2 and
-        len(text) >= 10
-    )
+    text_hits = 0
+    if len(text.split()) >= 2 and len(text) >= 10:
+        text_hits = sum(1 for pattern in course_text_patterns if pattern in text_lower)
     
-    return has_course_url or has_course_text
+    # Course names in the link text are a stronger signal than URL keywords
+    return url_hits + 2 * text_hits
+
+def is_likely_course_link(href, text):
+    """Check if link is likely a course page"""
+    return score_course_link(href, text) > 0
 
 def extract_course_info_from_page(course_url, original_text, source_url):
     """Extract course info from individual course page (Title + Body only)"""
-    print(f"Getting course info from: {course_url}")
+    logger.debug("Getting course info from: %s", course_url)
     
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(course_url, headers=headers, timeout=10)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Error fetching course page {course_url}: {e}")
+    soup = fetch_page(course_url, timeout=10)
+    if soup is None:
         return create_fallback_course_info(original_text, course_url, source_url)
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    
+    course_info, _ = extract_course_info_from_soup(soup, course_url, original_text, source_url)
+    return course_info
+
+def extract_course_info_from_soup(soup, course_url, original_text, source_url):
+    """Extract course info from a parsed page; also returns the cleaned body content"""
     # Get title
     title_elem = soup.find('title') or soup.find('h1')
     course_title = title_elem.get_text(strip=True) if title_elem else original_text
@@ -155,12 +177,17 @@ def extract_course_info_from_page(course_url, original_text, source_url):
     # Determine degree category
     degree_category = determine_degree_category(source_url, course_title, body_content)
     
-    return {
+    course_info = {
         'course': course_title,
         'degree': degree_category,
         'subjects': subjects,
         'source_url': course_url
     }
+    
+    # Structured facts (duration, eligibility, fees, syllabus, specializations)
+    course_info.update(extract_course_details(body_content))
+    
+    return course_info, body_content
 
 def create_fallback_course_info(original_text, course_url, source_url):
     """Create course info when individual page can't be accessed"""
@@ -168,7 +195,12 @@ def create_fallback_course_info(original_text, course_url, source_url):
         'course': clean_course_title(original_text),
         'degree': determine_degree_category(source_url, original_text, None),
         'subjects': [],
-        'source_url': course_url
+        'source_url': course_url,
+        'duration': None,
+        'eligibility': None,
+        'fees': None,
+        'syllabus': {},
+        'specializations': []
     }
 
 def clean_course_title(title):
@@ -215,6 +247,141 @@ def extract_subjects_from_body(body_content):
     
     return list(set(subjects))  # Remove duplicates
 
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*[-\s]?\s*(years?|yrs?|months?|semesters?)\b', re.IGNORECASE)
+FEE_PATTERN = re.compile(r'(?:₹|rs\.?|inr)\s*[\d,]+(?:\.\d+)?(?:\s*(?:lakhs?|per (?:annum|year|semester)))?', re.IGNORECASE)
+SEMESTER_PATTERN = re.compile(r'\b(?:semester|sem)\s*[-:]?\s*([ivx]+|\d+)\b', re.IGNORECASE)
+ROMAN_VALUES = {'i': 1, 'v': 5, 'x': 10}
+
+def semester_label(match):
+    """'Semester 2' for both "Sem II" and "Semester 2", so one semester gets one key"""
+    number = match.group(1).lower()
+    if not number.isdigit():
+        values = [ROMAN_VALUES[c] for c in number]
+        # A smaller numeral before a larger one subtracts (IV = 4)
+        number = sum(-v if i + 1 < len(values) and v < values[i + 1] else v for i, v in enumerate(values))
+    return f"Semester {int(number)}"
+
+def split_into_sections(body_content):
+    """Split body content into (heading text, [elements]) sections"""
+    sections = []
+    for heading in body_content.find_all(HEADING_TAGS):
+        level = int(heading.name[1])
+        elements = []
+        for sibling in heading.find_next_siblings():
+            if sibling.name in HEADING_TAGS and int(sibling.name[1]) <= level:
+                break
+            elements.append(sibling)
+        sections.append((heading.get_text(" ", strip=True), elements))
+    return sections
+
+def section_text(elements, max_chars=400):
+    text = " ".join(' '.join(el.get_text(" ", strip=True).split()) for el in elements)
+    return text[:max_chars].strip()
+
+def section_list_items(elements):
+    items = []
+    for el in elements:
+        list_items = el.find_all('li') if el.name not in ('li',) else [el]
+        for li in list_items:
+            text = ' '.join(li.get_text(" ", strip=True).split())
+            if text and text not in items:
+                items.append(text)
+    return items
+
+def extract_syllabus_tables(body_content):
+    """Semester-wise subjects from tables whose header or first column names a semester"""
+    syllabus = {}
+    for table in body_content.find_all('table'):
+        rows = table.find_all('tr')
+        if not rows:
+            continue
+        
+        header_cells = [c.get_text(" ", strip=True) for c in rows[0].find_all(['th', 'td'])]
+        header_semesters = [SEMESTER_PATTERN.search(c) for c in header_cells]
+        
+        if any(header_semesters):
+            # One column per semester
+            for row in rows[1:]:
+                for col, cell in enumerate(row.find_all(['th', 'td'])):
+                    if col < len(header_semesters) and header_semesters[col]:
+                        text = cell.get_text(" ", strip=True)
+                        if text:
+                            label = semester_label(header_semesters[col])
+                            syllabus.setdefault(label, []).append(text)
+        else:
+            # One row per subject, first column names the semester
+            for row in rows:
+                cells = [c.get_text(" ", strip=True) for c in row.find_all(['th', 'td'])]
+                if len(cells) >= 2:
+                    match = SEMESTER_PATTERN.search(cells[0])
+                    if match:
+                        label = semester_label(match)
+                        syllabus.setdefault(label, []).extend(c for c in cells[1:] if c)
+    return syllabus
+
+def extract_course_details(body_content):
+    """Parse headings, lists and tables into structured course facts"""
+    details = {
+        'duration': None,
+        'eligibility': None,
+        'fees': None,
+        'syllabus': {},
+        'specializations': []
+    }
+    if not body_content:
+        return details
+    
+    for heading, elements in split_into_sections(body_content):
+        heading_lower = heading.lower()
+        
+        if 'eligib' in heading_lower and not details['eligibility']:
+            details['eligibility'] = section_text(elements) or None
+        elif 'fee' in heading_lower and not details['fees']:
+            fee_match = FEE_PATTERN.search(section_text(elements, max_chars=1000))
+            details['fees'] = fee_match.group(0).strip() if fee_match else (section_text(elements, 200) or None)
+        elif 'duration' in heading_lower and not details['duration']:
+            duration_match = DURATION_PATTERN.search(section_text(elements))
+            if duration_match:
+                details['duration'] = duration_match.group(0)
+        elif 'speciali' in heading_lower or 'electives' in heading_lower:
+            for item in section_list_items(elements):
+                if item not in details['specializations']:
+                    details['specializations'].append(item)
+        elif SEMESTER_PATTERN.search(heading):
+            items = section_list_items(elements)
+            if items:
+                label = semester_label(SEMESTER_PATTERN.search(heading))
+                details['syllabus'].setdefault(label, []).extend(items)
+    
+    for label, subjects in extract_syllabus_tables(body_content).items():
+        details['syllabus'].setdefault(label, []).extend(subjects)
+    
+    body_text = ' '.join(body_content.get_text(" ", strip=True).split())
+    
+    # Fall back to the first mention anywhere on the page
+    if not details['duration']:
+        for sentence in re.split(r'(?<=[.!?])\s+', body_text):
+            if 'duration' in sentence.lower() or 'programme' in sentence.lower() or 'program' in sentence.lower():
+                duration_match = DURATION_PATTERN.search(sentence)
+                if duration_match:
+                    details['duration'] = duration_match.group(0)
+                    break
+    
+    if not details['fees']:
+        fee_match = FEE_PATTERN.search(body_text)
+        if fee_match:
+            details['fees'] = fee_match.group(0).strip()
+    
+    if not details['eligibility']:
+        for sentence in re.split(r'(?<=[.!?])\s+', body_text):
+            if 'eligib' in sentence.lower():
+                details['eligibility'] = sentence[:400]
+                break
+    
+    return details
+
 def determine_degree_category(source_url, course_title, body_content):
     """Determine degree category based on source URL and content"""
     source_url_lower = source_url.lower()
@@ -238,55 +405,142 @@ def determine_degree_category(source_url, course_title, body_content):
     
     return "General Programs"
 
-def main():
+def crawl_source(source_url, frontier, writer, max_seconds=None, journal=None, resume_state=None,
+                 checkpoint_every=25, chunk_writer=None):
+    """Crawl one source listing page and everything course-like reachable from it"""
+    added = 0
+    root_domain = shard_name_for_url(source_url)
+    started = time.time()
+    
+    if resume_state:
+        frontier.restore(list(resume_state['pending'].values()), resume_state['seen'], resume_state['popped'])
+        print(f"Resuming with {len(frontier)} queued URLs ({frontier.popped} already processed)")
+    else:
+        # Seed with the listing page and any course-like URLs from the sitemap
+        frontier.push(source_url, source_url=source_url, depth=0, score=100)
+        sitemap_urls = fetch_sitemap_urls(source_url)
+        for page_url in sitemap_urls:
+            score = score_course_link(page_url, "")
+            if score > 0 and same_site(page_url, root_domain):
+                frontier.push(page_url, source_url=source_url, depth=1, score=score)
+        print(f"Seeded {len(frontier)} URLs ({len(sitemap_urls)} in sitemap)")
+    
+    if journal:
+        journal.record_snapshot(source_url, frontier)
+    
+    while True:
+        if max_seconds is not None and time.time() - started > max_seconds:
+            print(f"⏱️ Time budget reached for {source_url}")
+            break
+        
+        link_info = frontier.pop()
+        if link_info is None:
+            break
+        
+        logger.debug("Getting course info from: %s", link_info['url'],
+                     extra={"fields": {"depth": link_info['depth'], "score": link_info['score']}})
+        soup = fetch_page(link_info['url'], timeout=10)
+        if soup is None:
+            if journal:
+                journal.record_page(source_url, link_info, [])
+            continue
+        
+        course_info, body_content = extract_course_info_from_soup(
+            soup, link_info['url'], link_info['text'], source_url
+        )
+        
+        # The listing page itself is not a course
+        if link_info['depth'] > 0 and len(course_info['course'].split()) >= 3:
+            course_info['catalog_source'] = root_domain
+            if writer.add(course_info):
+                added += 1
+                logger.info("Added: %s", course_info['course'])
+                # Keep the page text for grounded follow-up answers
+                if chunk_writer:
+                    chunk_writer.add_page(course_info, body_content.get_text(" ", strip=True))
+        
+        # Follow pagination and nested program listings
+        children = []
+        if link_info['depth'] < frontier.max_depth:
+            for child in extract_course_links_from_content(body_content, link_info['url']):
+                if not same_site(child['url'], root_domain):
+                    continue
+                child_info = {
+                    'url': child['url'],
+                    'text': child['text'],
+                    'source_url': source_url,
+                    'depth': link_info['depth'] + 1,
+                    'score': child['score']
+                }
+                if frontier.push(**child_info):
+                    children.append(child_info)
+        
+        if journal:
+            journal.record_page(source_url, link_info, children)
+            if frontier.popped % checkpoint_every == 0:
+                journal.record_snapshot(source_url, frontier)
+        
+        time.sleep(0.5)  # Be respectful
+    
+    if journal:
+        journal.record_source_done(source_url)
+    
+    return added
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape course catalogs from scrape_urls.json")
+    parser.add_argument("--max-pages", type=int, default=200, help="Pages to fetch per source")
+    parser.add_argument("--max-depth", type=int, default=3, help="Link depth to follow from each source")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Time budget per source")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted crawl from its journal")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="Checkpoint journal file")
+    parser.add_argument("--stream", default=STREAM_PATH, help="JSONL file courses are streamed to")
+    parser.add_argument("--chunks", default=CHUNKS_PATH, help="JSONL chunk store of course page text")
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main scraping function"""
+    args = parse_args(argv)
+    configure_logging()
     print("🚀 Starting simple body-content scraping...")
     
-    all_courses = []
+    done_sources, resume_states = set(), {}
+    if args.resume:
+        done_sources, resume_states = load_journal(args.journal)
+    
+    journal = CrawlJournal(args.journal, resume=args.resume)
+    writer = StreamingCourseWriter(args.stream, resume=args.resume)
+    chunk_writer = ChunkWriter(args.chunks, resume=args.resume)
+    if args.resume:
+        print(f"♻️ Resuming: {len(done_sources)} source(s) done, {writer.count} courses recovered")
     
     for source_url in urls:
+        if source_url in done_sources:
+            print(f"\n--- Skipping {source_url} (already crawled) ---")
+            continue
         print(f"\n--- Processing {source_url} ---")
         
-        # Step 1: Get course links from body content only
-        course_links = extract_course_links_from_body(source_url)
-        print(f"Found {len(course_links)} course links")
-        
-        # Step 2: Extract info from each course page (title + body)
-        for link_info in course_links[:10]:  # Limit to prevent overload
-            course_info = extract_course_info_from_page(
-                link_info['url'], 
-                link_info['text'], 
-                source_url
-            )
-            
-            if course_info and len(course_info['course'].split()) >= 3:
-                all_courses.append(course_info)
-                print(f"✅ Added: {course_info['course']}")
-            
-            time.sleep(0.5)  # Be respectful
-    
-    # Remove duplicates
-    seen_courses = set()
-    unique_courses = []
+        frontier = CrawlFrontier(max_depth=args.max_depth, max_pages=args.max_pages)
+        added = crawl_source(source_url, frontier, writer, args.max_seconds, journal,
+                             resume_states.get(source_url), chunk_writer=chunk_writer)
+        print(f"Found {added} new courses in {frontier.popped} pages")
     
-    for course in all_courses:
-        course_key = course['course'].lower().strip()
-        if course_key not in seen_courses:
-            seen_courses.add(course_key)
-            unique_courses.append(course)
+    journal.close()
+    writer.close()
+    chunk_writer.close()
     
     print(f"\n✅ SCRAPING COMPLETE")
-    print(f"📊 Total unique courses: {len(unique_courses)}")
-    
-    # Save results
-    with open("courses.json", "w", encoding='utf-8') as f:
-        json.dump(unique_courses, f, indent=2, ensure_ascii=False)
+    print(f"📊 Total unique courses: {writer.count}")
     
-    print("💾 Saved to courses.json")
+    # Merge near-duplicates and save results (courses.json plus one catalog shard per source domain)
+    _, shard_count = compact_courses(args.stream)
+    print(f"💾 Saved to courses.json and {shard_count} catalog shard(s) in catalogs/")
     
     # Show sample
     print("\n📋 Sample courses found:")
-    for i, course in enumerate(unique_courses[:5]):
+    for i, course in enumerate(iter_courses_jsonl(args.stream)):
+        if i >= 5:
+            break
         print(f"{i+1}. {course['course']}")
         print(f"   URL: {course['source_url']}")
         print()
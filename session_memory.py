@@ -0,0 +1,79 @@
+# session_memory.py - Per-session memory accounting for the admin view
+import sys
+import threading
+import time
+import tracemalloc
+
+# Containers and objects are walked to this depth; deeper objects count as their shallow size
+MAX_DEPTH = 8
+
+# session id -> (per-key sizes, last updated); every session in this process
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def estimate_size(obj, shared_ids=frozenset(), seen=None, depth=0):
+    """Approximate deep size in bytes, not counting objects in shared_ids (or anything they hold)"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or id(obj) in shared_ids:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj, 0)
+    if depth >= MAX_DEPTH or isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key, shared_ids, seen, depth + 1)
+            size += estimate_size(value, shared_ids, seen, depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_size(item, shared_ids, seen, depth + 1)
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), shared_ids, seen, depth + 1)
+    return size
+
+def session_sizes(session_state, shared=()):
+    """Estimated bytes held by each session key, largest first.
+
+    Objects in shared (e.g. the process-wide course catalog) belong to every
+    session and are left out, so the numbers reflect what one session costs.
+    """
+    shared_ids = frozenset(id(obj) for obj in shared if obj is not None)
+    sizes = {}
+    for key in list(session_state.keys()):
+        try:
+            sizes[str(key)] = estimate_size(session_state[key], shared_ids)
+        except Exception:
+            # Objects with exotic internals (locks, futures) just aren't counted
+            sizes[str(key)] = 0
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+def record_session(session_id, sizes):
+    with _sessions_lock:
+        _sessions[session_id] = (sizes, time.time())
+
+def forget_session(session_id):
+    with _sessions_lock:
+        _sessions.pop(session_id, None)
+
+def all_sessions(max_age=3600):
+    """Recorded sizes for sessions seen within max_age seconds, largest first"""
+    cutoff = time.time() - max_age
+    with _sessions_lock:
+        for session_id in [s for s, (_, updated) in _sessions.items() if updated < cutoff]:
+            del _sessions[session_id]
+        rows = [(session_id, sum(sizes.values()), sizes, updated) for session_id, (sizes, updated) in _sessions.items()]
+    return sorted(rows, key=lambda row: row[1], reverse=True)
+
+def start_tracing(frames=1):
+    """Start tracemalloc (for MEMORY_TRACE=1); it slows allocation, so keep it off normally"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+def top_allocations(limit=10):
+    """(location, KiB, blocks) for the biggest allocation sites, or [] when not tracing"""
+    if not tracemalloc.is_tracing():
+        return []
+    stats = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+    return [(str(stat.traceback[0]), stat.size / 1024, stat.count) for stat in stats]
@@ -0,0 +1,98 @@
+# session_store.py - Server-side SQLite (WAL) store for resumable advising sessions
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+SESSION_DB = os.getenv("SESSION_DB", "sessions.db")
+
+# Sessions untouched for this long are purged
+SESSION_TTL_SECONDS = 7 * 24 * 3600
+# Expired sessions are purged at startup and then at most this often, on save
+PURGE_INTERVAL_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    page TEXT NOT NULL,
+    profile TEXT,
+    messages TEXT NOT NULL,
+    conversation_state TEXT,
+    chat_memory TEXT,
+    catalog_sources TEXT,
+    catalog_version TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+def new_token():
+    """Unguessable, URL-safe resume token"""
+    return secrets.token_urlsafe(16)
+
+class SessionStore:
+    """Session snapshots keyed by resume token, one SQLite connection per thread"""
+
+    def __init__(self, path=SESSION_DB):
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as conn:
+            conn.execute(SCHEMA)
+        self.last_purge = 0.0
+        self._purge_if_due()
+
+    def _purge_if_due(self):
+        # Stored sessions hold student marks and profiles; don't keep them past the TTL
+        if time.time() - self.last_purge >= PURGE_INTERVAL_SECONDS:
+            self.last_purge = time.time()
+            self.purge_expired()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            # WAL lets readers proceed while a session is being written
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def save(self, token, page, profile, messages, conversation_state=None, chat_memory=None,
+             catalog_sources=None, catalog_version=None):
+        """Insert or replace a session snapshot"""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (token, page, json.dumps(profile, ensure_ascii=False), json.dumps(messages, ensure_ascii=False),
+                 json.dumps(conversation_state), json.dumps(chat_memory), json.dumps(catalog_sources),
+                 catalog_version, time.time())
+            )
+        self._purge_if_due()
+
+    def load(self, token):
+        """The stored session as a dict, or None for unknown or expired tokens"""
+        row = self._connection().execute(
+            "SELECT page, profile, messages, conversation_state, chat_memory, catalog_sources, catalog_version, updated_at "
+            "FROM sessions WHERE token = ?", (token,)
+        ).fetchone()
+        if row is None or time.time() - row[7] > SESSION_TTL_SECONDS:
+            return None
+        return {
+            "page": row[0],
+            "profile": json.loads(row[1]),
+            "messages": json.loads(row[2]),
+            "conversation_state": json.loads(row[3]),
+            "chat_memory": json.loads(row[4]),
+            "catalog_sources": json.loads(row[5]),
+            "catalog_version": row[6]
+        }
+
+    def delete(self, token):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+    def purge_expired(self, ttl=SESSION_TTL_SECONDS):
+        """Remove stale sessions; returns how many were deleted"""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - ttl,)).rowcount
@@ -0,0 +1,8 @@
+# conftest.py - Make the top-level modules importable from the tests directory
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# scraper reads scrape_urls.json from the working directory at import time
+os.chdir(ROOT)
@@ -0,0 +1,53 @@
+# test_clarification.py - Free-text mark parsing and targeted completeness re-checks
+from clarification import apply_clarification_answer, parse_marks
+from profile_builder import COMPLETENESS_WEIGHTS, reassess_profile_completeness
+
+def profile_missing(*areas):
+    return {
+        "marks_data": {},
+        "interests": [],
+        "aspiration": "",
+        "favorite_subjects": [],
+        "extra_curricular_details": "",
+        "missing_areas": list(areas),
+        "completeness_score": 100 - sum(COMPLETENESS_WEIGHTS[area] for area in areas),
+    }
+
+def test_parse_marks_subject_and_score_in_either_order():
+    assert parse_marks("Maths 90, Physics: 85% and 92 in Chemistry") == {"Maths": 90, "Physics": 85, "Chemistry": 92}
+    assert parse_marks("I got 78 marks in computer science.") == {"Computer Science": 78}
+
+def test_parse_marks_scales_fractions_to_percentages():
+    assert parse_marks("I scored 95/100 in maths") == {"Maths": 95}
+    assert parse_marks("Physics 45 out of 50, chemistry: 38/40") == {"Physics": 90, "Chemistry": 95}
+    assert parse_marks("Maths 120/100") == {}
+
+def test_parse_marks_ignores_numbers_that_are_not_marks():
+    assert parse_marks("I am 17 and live in block 42") == {}
+    assert parse_marks("I am 17 and got 88 in English") == {"English": 88}
+
+def test_reassess_only_touches_the_given_areas():
+    profile = profile_missing("academic performance data", "detailed career aspiration")
+    profile["marks_data"] = {"Maths": 90, "Physics": 85, "Chemistry": 80}
+
+    reassess_profile_completeness(profile, ["academic performance data"])
+    assert profile["missing_areas"] == ["detailed career aspiration"]
+    assert profile["completeness_score"] == 75
+    assert not profile["needs_clarification"]
+
+def test_reassess_reopens_an_area_that_became_incomplete():
+    profile = profile_missing()
+    reassess_profile_completeness(profile, ["detailed career aspiration"])
+    assert profile["missing_areas"] == ["detailed career aspiration"]
+    assert profile["completeness_score"] == 75
+    assert profile["clarifying_questions"] == []
+
+def test_clarification_answer_with_marks_completes_academics():
+    profile = profile_missing("academic performance data", "detailed career aspiration")
+    profile["pending_clarification"] = "academic performance data"
+    profile["interests"] = ["Science"]
+
+    apply_clarification_answer(profile, "I scored 95/100 in maths, 88 in physics and chemistry 45 out of 50")
+    assert profile["marks_data"] == {"Maths": 95, "Physics": 88, "Chemistry": 90}
+    assert profile["strengths"] == ["Maths", "Chemistry", "Physics"]
+    assert "academic performance data" not in profile["missing_areas"]
@@ -0,0 +1,119 @@
+# test_crawler.py - Crawl frontier and scraper against a local fixture web server
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import scraper
+from catalog import shard_name_for_url
+from course_stream import StreamingCourseWriter, iter_courses_jsonl
+from crawler import CrawlFrontier, fetch_sitemap_urls, normalize_url, same_site
+
+def page(title, links=()):
+    anchors = "".join(f'<p><a href="{href}">{text}</a></p>' for href, text in links)
+    return f"<html><head><title>{title}</title></head><body><main><h1>{title}</h1>{anchors}</main></body></html>"
+
+PAGES = {
+    "/programs": page("Our Programs", [
+        ("/program/bcom-banking-finance", "B.Com in Banking and Finance Program"),
+        ("/programs?page=2", "More programs listing"),
+        ("/program/intake?session=2024-25", "Admission session 2024-25 program"),
+        ("/program/intake?session=2025-26", "Admission session 2025-26 program"),
+        ("http://offsite.invalid/program/elsewhere", "Another university degree program"),
+    ]),
+    "/programs?page=2": page("More Programs", [
+        ("/program/bsc-sports-sciences", "BSc in Sports Sciences Degree"),
+    ]),
+    "/program/bcom-banking-finance": page("B.Com in Banking and Finance"),
+    "/program/bsc-sports-sciences": page("BSc in Sports Sciences"),
+    "/program/intake?session=2024-25": page("Admission Intake 2024-25 Program"),
+    "/program/intake?session=2025-26": page("Admission Intake 2025-26 Program"),
+    "/program/mdes-user-experience": page("M.Des in User Experience Design"),
+}
+
+def sitemap(base_url):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"<url><loc>{base_url}/program/mdes-user-experience</loc></url>"
+        "</urlset>"
+    )
+
+@pytest.fixture
+def fixture_site():
+    """Serve PAGES (and a sitemap) on 127.0.0.1 with an explicit port"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/sitemap.xml":
+                body, content_type = sitemap(base_url), "application/xml"
+            elif self.path in PAGES:
+                body, content_type = PAGES[self.path], "text/html"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield base_url
+    server.shutdown()
+    server.server_close()
+
+def test_same_site_ignores_ports_on_both_sides():
+    assert same_site("http://127.0.0.1:8765/program/x", "127.0.0.1:8765")
+    assert same_site("http://127.0.0.1/program/x", "127.0.0.1:8765")
+    assert same_site("https://soc.example.edu/program", "example.edu")
+    assert not same_site("http://localhost:8765/program/x", "127.0.0.1:8765")
+    assert not same_site("https://notexample.edu/program", "example.edu")
+
+def test_normalize_url_strips_only_tracking_params():
+    assert normalize_url("https://a.edu/p/?utm_source=x&gclid=1&b=2") == "https://a.edu/p?b=2"
+    assert normalize_url("https://a.edu/p?session=2024-25") != normalize_url("https://a.edu/p?session=2025-26")
+    assert "ref=" not in normalize_url("https://a.edu/p?utm_campaign=ref")
+    assert "reference=7" in normalize_url("https://a.edu/p?reference=7")
+
+def test_frontier_pops_best_score_first_and_dedupes():
+    frontier = CrawlFrontier(max_depth=2, max_pages=10)
+    assert frontier.push("https://a.edu/low", score=1)
+    assert frontier.push("https://a.edu/high", score=5)
+    assert not frontier.push("https://A.edu/high/?utm_source=x", score=9)
+    assert not frontier.push("https://a.edu/deep", depth=3, score=9)
+    assert frontier.pop()["url"] == "https://a.edu/high"
+    assert frontier.pop()["url"] == "https://a.edu/low"
+    assert frontier.pop() is None
+
+def test_sitemap_urls_from_fixture_server(fixture_site):
+    assert fetch_sitemap_urls(fixture_site + "/programs") == [fixture_site + "/program/mdes-user-experience"]
+
+def test_crawl_source_follows_pagination_and_sitemap(fixture_site, tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    stream_path = str(tmp_path / "courses.jsonl")
+    writer = StreamingCourseWriter(stream_path)
+    frontier = CrawlFrontier(max_depth=3, max_pages=50)
+
+    added = scraper.crawl_source(fixture_site + "/programs", frontier, writer)
+    writer.close()
+
+    titles = {course["course"] for course in iter_courses_jsonl(stream_path)}
+    assert titles == {
+        "B.Com in Banking and Finance",
+        "BSc in Sports Sciences",
+        "M.Des in User Experience Design",
+        "Admission Intake 2024-25 Program",
+        "Admission Intake 2025-26 Program",
+    }
+    assert added == len(titles)
+    # Off-site links are never queued
+    assert not any("offsite.invalid" in url for url in frontier.seen)
+    sources = {course["catalog_source"] for course in iter_courses_jsonl(stream_path)}
+    assert sources == {shard_name_for_url(fixture_site)}
@@ -0,0 +1,44 @@
+# test_near_duplicates.py - Which scraped course titles merge as near-duplicates
+import pytest
+
+from near_duplicates import find_near_duplicate_clusters, within_one_edit
+
+def course(title, source="jainuniversity.ac.in", subjects=()):
+    return {"course": title, "catalog_source": source, "subjects": list(subjects)}
+
+def merges(title_a, title_b, **kwargs):
+    return find_near_duplicate_clusters([course(title_a, **kwargs), course(title_b, **kwargs)]) == [[0, 1]]
+
+@pytest.mark.parametrize("title_a, title_b", [
+    ("B.Sc Computer Science", "BSc in Computer Sciences"),
+    ("B.Com Accounting and Finance", "B.Com Acounting and Finance"),
+    ("BCA Data Analytics", "BCA Data Analytic"),
+    ("B.Com (Hons)", "Bachelor of Commerce Honours"),
+])
+def test_variants_of_one_program_merge(title_a, title_b):
+    assert merges(title_a, title_b)
+
+@pytest.mark.parametrize("title_a, title_b", [
+    ("B.Com CA", "B.Com General Management"),
+    ("B.Com", "B.Com CA"),
+    ("B.Com CA", "B.Com CS"),
+    ("MBA Kochi", "MBA Bangalore"),
+])
+def test_different_programs_stay_apart(title_a, title_b):
+    assert not merges(title_a, title_b)
+
+def test_same_title_from_two_institutions_stays_apart():
+    courses = [course("B.Sc Computer Science"), course("BSc Computer Sciences", source="example.edu")]
+    assert find_near_duplicate_clusters(courses) == []
+
+def test_dissimilar_subjects_keep_titles_apart():
+    assert merges("BBA Marketing", "BBA Marketing")
+    courses = [course("BBA Marketing", subjects=["Branding", "Sales"]),
+               course("BBA Marketing", subjects=["Accounting", "Tax"])]
+    assert find_near_duplicate_clusters(courses) == []
+
+def test_within_one_edit():
+    assert within_one_edit("accounting", "acounting")
+    assert within_one_edit("finance", "finanse")
+    assert not within_one_edit("kochi", "kerala")
+    assert not within_one_edit("design", "desk")
@@ -0,0 +1,238 @@
+# tracing.py - Lightweight per-stage timing spans with JSONL and Prometheus export
+import atexit
+import functools
+import json
+import multiprocessing.util
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# TRACING=1 enables spans; TRACE_FILE additionally appends every span to a JSONL file
+_enabled = os.getenv("TRACING", "").lower() in ("1", "true", "yes")
+_trace_file = os.getenv("TRACE_FILE") or None
+
+_lock = threading.Lock()
+_current_span = ContextVar("current_span", default=None)
+
+# Histogram buckets in seconds, from fast local work up to slow LLM round trips
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_durations = {}  # span name -> {"count", "sum", "buckets"}
+_counters = {}   # (metric name, span name) -> value
+
+# Span records are written to TRACE_FILE by a background thread, so a slow disk never holds _lock
+_trace_queue = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+
+def enable(trace_file=None):
+    """Turn tracing on at runtime, optionally exporting spans to a JSONL file"""
+    global _enabled, _trace_file
+    _enabled = True
+    if trace_file:
+        _trace_file = trace_file
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+class Span:
+    __slots__ = ("name", "trace_id", "parent", "started", "attributes")
+
+    def __init__(self, name, trace_id, parent):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.attributes = {}
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block of code; yields the Span (or None when tracing is disabled)"""
+    if not _enabled:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.trace_id if parent else uuid.uuid4().hex[:16], parent.name if parent else None)
+    current.attributes.update(attributes)
+    token = _current_span.set(current)
+    error = None
+    try:
+        yield current
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(current, time.perf_counter() - current.started, error)
+
+def traced(name):
+    """Decorator form of span(); a single flag check when tracing is disabled"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def set_attributes(**attributes):
+    """Attach attributes (e.g. token counts) to the innermost active span"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+def increment_counter(metric, name, value=1):
+    """Bump a counter exported as metric{span="name"} (recorded even when spans are off)"""
+    with _lock:
+        _counters[(metric, name)] = _counters.get((metric, name), 0) + value
+
+def _finish(current, duration, error):
+    with _lock:
+        stats = _durations.setdefault(current.name, {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)})
+        stats["count"] += 1
+        stats["sum"] += duration
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                stats["buckets"][i] += 1
+        for key in ("prompt_tokens", "completion_tokens"):
+            if key in current.attributes:
+                counter = (f"advisor_{key}_total", current.name)
+                _counters[counter] = _counters.get(counter, 0) + current.attributes[key]
+        if error:
+            counter = ("advisor_span_errors_total", current.name)
+            _counters[counter] = _counters.get(counter, 0) + 1
+
+    if _trace_file:
+        _start_writer()
+        _trace_queue.put((_trace_file, {
+            "trace_id": current.trace_id,
+            "span": current.name,
+            "parent": current.parent,
+            "duration_ms": round(duration * 1000, 3),
+            "timestamp": time.time(),
+            "error": error,
+            **current.attributes
+        }))
+
+def _write_traces():
+    """Writer thread: append queued records, keeping the file open between bursts"""
+    path, f = None, None
+    try:
+        while True:
+            item = _trace_queue.get()
+            if item is None:
+                return
+            record_path, record = item
+            if record_path != path:
+                if f is not None:
+                    f.close()
+                path, f = record_path, open(record_path, "a", encoding="utf-8")
+            f.write(json.dumps(record) + "\n")
+            if _trace_queue.empty():
+                f.flush()
+    finally:
+        if f is not None:
+            f.close()
+
+def _start_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_traces, name="trace-writer", daemon=True)
+            _writer.start()
+
+def flush_traces():
+    """Write out queued span records and stop the writer (registered at exit)"""
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _trace_queue.put(None)
+            _writer.join()
+            _writer = None
+
+def _register_flush():
+    atexit.register(flush_traces)
+    # Pool workers exit without running atexit, but do run multiprocessing finalizers (per process)
+    multiprocessing.util.Finalize(None, flush_traces, exitpriority=10)
+
+def _reset_after_fork():
+    # A forked child has the parent's queued records but not its writer thread
+    global _trace_queue, _writer, _writer_lock
+    _trace_queue = queue.SimpleQueue()
+    _writer = None
+    _writer_lock = threading.Lock()
+    _register_flush()
+
+_register_flush()
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def prometheus_text():
+    """Current metrics in the Prometheus text exposition format"""
+    lines = [
+        "# HELP advisor_span_duration_seconds Time spent in each pipeline stage",
+        "# TYPE advisor_span_duration_seconds histogram"
+    ]
+    with _lock:
+        for name, stats in sorted(_durations.items()):
+            for bound, count in zip(BUCKETS, stats["buckets"]):
+                lines.append(f'advisor_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'advisor_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'advisor_span_duration_seconds_sum{{span="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'advisor_span_duration_seconds_count{{span="{name}"}} {stats["count"]}')
+
+        metric_names = sorted({metric for metric, _ in _counters})
+        for metric in metric_names:
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_metric, name), value in sorted(_counters.items()):
+                if counter_metric == metric:
+                    lines.append(f'{metric}{{span="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+def reset_metrics():
+    with _lock:
+        _durations.clear()
+        _counters.clear()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_metrics_server = None
+
+def start_metrics_server(port, host="0.0.0.0"):
+    """Serve /metrics for Prometheus in a background thread (once per process)"""
+    global _metrics_server
+    if _metrics_server is None:
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        _metrics_server.daemon_threads = True
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
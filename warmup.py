@@ -0,0 +1,60 @@
+# warmup.py - Server-start warm-up so the first student doesn't pay for cold caches
+import argparse
+import threading
+import time
+
+from app_logging import get_logger
+from archetypes import load_table
+from catalog import catalog_fingerprint
+from course_matcher import get_openai, load_courses, warm_connection
+from course_mentions import get_mention_detector
+from course_retrieval import get_index
+
+logger = get_logger("warmup")
+
+def warm_up(sources=None, connect=True):
+    """Preload the catalog, build matchers and indexes, import heavy modules and
+    open a pooled LLM connection. Returns seconds spent per step."""
+    timings = {}
+
+    def step(name, fn):
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, type(e).__name__)
+            result = None
+        timings[name] = time.perf_counter() - started
+        return result
+
+    courses = step("catalog", lambda: load_courses(sources=sources))
+    if courses is not None:
+        step("mention_matcher", lambda: get_mention_detector(courses))
+        step("catalog_fingerprint", lambda: catalog_fingerprint(courses))
+    step("retrieval_index", get_index)
+    step("archetypes", load_table)
+    step("pdfplumber", lambda: __import__("pdfplumber"))
+    step("openai", get_openai)
+    if connect:
+        step("llm_connection", warm_connection)
+    return timings
+
+def warm_up_in_background(sources=None, connect=True):
+    """Run warm_up on a daemon thread so server start isn't blocked"""
+    thread = threading.Thread(target=warm_up, args=(sources, connect), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm caches and connections, reporting time per step")
+    parser.add_argument("--no-connect", action="store_true", help="Skip opening a connection to the LLM endpoint")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    timings = warm_up(connect=not args.no_connect)
+    for name, seconds in timings.items():
+        print(f"   {name:<22} {seconds * 1000:8.1f} ms")
+    print(f"🔥 Warm-up finished in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()